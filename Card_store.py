@@ -0,0 +1,256 @@
+import argparse
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Deck_storage import CARD_FIELDS, ensure_card_id, to_micros, from_micros
+
+CARD_DTYPE = np.dtype([
+    ('front_offset', np.int64),
+    ('front_length', np.int32),
+    ('back_offset', np.int64),
+    ('back_length', np.int32),
+    ('ease_factor', np.float64),
+    ('interval', np.int32),
+    ('repetitions', np.int16),
+    ('next_review', np.int64),
+    ('created', np.int64),
+])
+STANDARD_FIELDS = frozenset(CARD_FIELDS)
+TEXT_FIELDS = ("front", "back")
+MIN_DEAD_TEXT_BYTES = 1 << 16
+
+
+def micros_column(values):
+    values = list(values)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            return np.array(values, dtype='datetime64[us]').astype(np.int64)
+    except (ValueError, TypeError, Warning):
+        return np.array([to_micros(value) for value in values], dtype=np.int64)
+
+
+class StringTable:
+    def __init__(self):
+        self._blob = bytearray()
+        self.dead = 0
+
+    def __len__(self):
+        return len(self._blob)
+
+    def release(self, length):
+        self.dead += length
+
+    def needs_compaction(self):
+        return self.dead > MIN_DEAD_TEXT_BYTES and self.dead * 2 > len(self._blob)
+
+    def add_many(self, texts):
+        encoded = [text.encode('utf-8') for text in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        offsets = len(self._blob) + np.cumsum(lengths) - lengths
+        self._blob += b''.join(encoded)
+        return offsets, lengths
+
+    def get(self, offset, length):
+        return self._blob[offset:offset + length].decode('utf-8')
+
+
+class CompactCardList:
+    def __init__(self, cards=(), capacity=1024):
+        self._data = np.zeros(capacity, dtype=CARD_DTYPE)
+        self._ids = []
+        self._extra = {}
+        self._text = StringTable()
+        self.extend(cards)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _grow(self, needed):
+        if needed > len(self._data):
+            data = np.zeros(max(needed, len(self._data) * 2), dtype=CARD_DTYPE)
+            data[:len(self._ids)] = self._data[:len(self._ids)]
+            self._data = data
+
+    def _store_text(self, block, cards):
+        for name in TEXT_FIELDS:
+            block[f'{name}_offset'], block[f'{name}_length'] = self._text.add_many(c[name] for c in cards)
+
+    def _replace_text(self, i, card):
+        row = self._data[i:i + 1]
+        for name in TEXT_FIELDS:
+            length = int(row[f'{name}_length'][0])
+            if self._text.get(int(row[f'{name}_offset'][0]), length) != card[name]:
+                self._text.release(length)
+                row[f'{name}_offset'], row[f'{name}_length'] = self._text.add_many([card[name]])
+        if self._text.needs_compaction():
+            self._compact_text()
+
+    def _compact_text(self):
+        rows = self._data[:len(self)]
+        texts = {name: self.column(name) for name in TEXT_FIELDS}
+        self._text = StringTable()
+        self._store_text(rows, [dict(zip(TEXT_FIELDS, pair)) for pair in zip(*texts.values())])
+
+    def _store(self, start, cards):
+        block = self._data[start:start + len(cards)]
+        block['ease_factor'] = [c.get("ease_factor", 2.5) for c in cards]
+        block['interval'] = [c.get("interval", 0) for c in cards]
+        block['repetitions'] = [c.get("repetitions", 0) for c in cards]
+        block['next_review'] = micros_column(c["next_review"] for c in cards)
+        block['created'] = micros_column(c.get("created", c["next_review"]) for c in cards)
+        for i, card in enumerate(cards, start):
+            if card.keys() <= STANDARD_FIELDS:
+                self._extra.pop(i, None)
+            else:
+                self._extra[i] = {k: v for k, v in card.items() if k not in STANDARD_FIELDS}
+
+    def append(self, card):
+        self.extend([card])
+
+    def extend(self, cards):
+        cards = list(cards)
+        if not cards:
+            return
+        start = len(self._ids)
+        self._grow(start + len(cards))
+        self._ids.extend(ensure_card_id(card)["id"] for card in cards)
+        self._store_text(self._data[start:start + len(cards)], cards)
+        self._store(start, cards)
+
+    def card(self, i):
+        row = self._data[i]
+        card = {
+            "id": self._ids[i],
+            "front": self._text.get(int(row['front_offset']), int(row['front_length'])),
+            "back": self._text.get(int(row['back_offset']), int(row['back_length'])),
+            "ease_factor": float(row['ease_factor']),
+            "interval": int(row['interval']),
+            "repetitions": int(row['repetitions']),
+            "next_review": from_micros(int(row['next_review'])),
+            "created": from_micros(int(row['created']))
+        }
+        extra = self._extra.get(i)
+        if extra:
+            card.update(extra)
+        return card
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.card(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("card index out of range")
+        return self.card(i)
+
+    def __setitem__(self, i, card):
+        if isinstance(i, slice):
+            if i != slice(None):
+                raise ValueError("only full-slice assignment is supported")
+            cards = list(card)
+            self.clear()
+            self.extend(cards)
+            return
+        if i < 0:
+            i += len(self)
+        self._ids[i] = ensure_card_id(card)["id"]
+        self._replace_text(i, card)
+        self._store(i, [card])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.card(i)
+
+    def clear(self):
+        self._data = np.zeros(len(self._data), dtype=CARD_DTYPE)
+        self._ids = []
+        self._extra = {}
+        self._text = StringTable()
+
+    def column(self, name):
+        if name == "id":
+            return self._ids
+        if name in ("front", "back"):
+            rows = self._data[:len(self)]
+            return [self._text.get(offset, length) for offset, length in
+                    zip(rows[f'{name}_offset'].tolist(), rows[f'{name}_length'].tolist())]
+        return self._data[name][:len(self)]
+
+    def due_entries(self):
+        return list(zip(self._data['next_review'][:len(self)].tolist(), self._ids))
+
+    def nbytes(self):
+        return self._data.nbytes + len(self._text)
+
+
+def _synthetic_cards(count):
+    now = datetime.now()
+    cards = []
+    for i in range(count):
+        due = now + timedelta(minutes=(i * 37) % 20000 - 10000)
+        cards.append({
+            "id": ensure_card_id({})["id"],
+            "front": f"word {i}",
+            "back": f"translation of word {i}",
+            "ease_factor": 2.5,
+            "interval": i % 30,
+            "repetitions": i % 7,
+            "next_review": due.isoformat(),
+            "created": now.isoformat()
+        })
+    return cards
+
+
+def _measure(build):
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def benchmark_memory(count):
+    import json
+    payload = json.dumps(_synthetic_cards(count))
+    dicts, dict_bytes, dict_seconds = _measure(lambda: json.loads(payload))
+    del dicts
+    compact, compact_bytes, compact_seconds = _measure(lambda: CompactCardList(json.loads(payload)))
+    return {
+        "cards": count,
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "dict_bytes_per_card": dict_bytes / count,
+        "compact_bytes_per_card": compact_bytes / count,
+        "ratio": dict_bytes / compact_bytes if compact_bytes else 0.0,
+        "dict_build_seconds": dict_seconds,
+        "compact_build_seconds": compact_seconds
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact flashcard store utilities")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench = commands.add_parser("bench", help="Compare memory of dict cards with the compact store")
+    bench.add_argument("--cards", type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    result = benchmark_memory(args.cards)
+    print(f"cards: {result['cards']}")
+    print(f"dict:    {result['dict_bytes'] / 1e6:8.1f} MB  "
+          f"({result['dict_bytes_per_card']:.0f} B/card, built in {result['dict_build_seconds']:.2f}s)")
+    print(f"compact: {result['compact_bytes'] / 1e6:8.1f} MB  "
+          f"({result['compact_bytes_per_card']:.0f} B/card, built in {result['compact_build_seconds']:.2f}s)")
+    print(f"ratio:   {result['ratio']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_DECK_PATH = "flashcards.sqlite"
+LEGACY_DECK_PATH = "flashcards.json"
+CARD_FIELDS = ("id", "front", "back", "ease_factor", "interval", "repetitions", "next_review", "created")
+CARD_COLUMNS = ("card_id",) + CARD_FIELDS[1:]
+
+
+def new_card_id():
+    return uuid.uuid4().hex
+
+
+def ensure_card_id(card):
+    if not card.get("id"):
+        card["id"] = new_card_id()
+    return card
+
+
+MICROS_EPOCH = datetime(1970, 1, 1)
+COMPACT_DECKS = os.environ.get("STUDYHUB_COMPACT_DECKS") == "1"
+
+
+def to_micros(when):
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return (when - MICROS_EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros):
+    return (MICROS_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def prepare_card(card, now=None):
+    front, back = card.get("front"), card.get("back")
+    if not isinstance(front, str) or not front.strip() or not isinstance(back, str):
+        raise ValueError(f"card needs a non-empty front and a back: {card!r}")
+    now = now or datetime.now().isoformat()
+    prepared = dict(card)
+    prepared["ease_factor"] = float(card.get("ease_factor", 2.5))
+    prepared["interval"] = int(card.get("interval", 0))
+    prepared["repetitions"] = int(card.get("repetitions", 0))
+    for field in ("next_review", "created"):
+        when = card.get(field) or now
+        to_micros(when)
+        prepared[field] = when.isoformat() if isinstance(when, datetime) else when
+    return prepared
+
+
+def normalize_front(front):
+    return re.sub(r'\s+', ' ', front).strip().casefold()
+
+
+class JsonDeckStorage:
+    def __init__(self, path=LEGACY_DECK_PATH):
+        self.path = path
+
+    def load(self):
+        if not Path(self.path).exists():
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            cards = json.load(f).get("cards", [])
+        for card in cards:
+            ensure_card_id(card)
+        return cards
+
+    def save_all(self, cards):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"cards": list(cards)}, f, indent=2, ensure_ascii=False)
+
+    def apply(self, added, updated, all_cards):
+        self.save_all(all_cards)
+
+    def clear(self):
+        self.save_all([])
+
+    def close(self):
+        pass
+
+
+class SqliteDeckStorage:
+    def __init__(self, path=DEFAULT_DECK_PATH, legacy_path=LEGACY_DECK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cards (
+                id INTEGER PRIMARY KEY,
+                card_id TEXT,
+                front TEXT NOT NULL,
+                back TEXT NOT NULL,
+                ease_factor REAL NOT NULL DEFAULT 2.5,
+                interval INTEGER NOT NULL DEFAULT 0,
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                next_review TEXT NOT NULL,
+                created TEXT NOT NULL,
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_cards_next_review ON cards(next_review);
+            CREATE INDEX IF NOT EXISTS idx_cards_front ON cards(front);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+        self._migrate_card_ids()
+        if legacy_path:
+            self.migrate_json(legacy_path)
+
+    def _migrate_card_ids(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cards)")}
+        with self._conn:
+            if "card_id" not in columns:
+                self._conn.execute("ALTER TABLE cards ADD COLUMN card_id TEXT")
+            missing = self._conn.execute("SELECT id FROM cards WHERE card_id IS NULL").fetchall()
+            self._conn.executemany("UPDATE cards SET card_id = ? WHERE id = ?",
+                                   [(new_card_id(), row[0]) for row in missing])
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_card_id ON cards(card_id)")
+
+    def _row(self, card):
+        extra = {k: v for k, v in card.items() if k not in CARD_FIELDS}
+        return (ensure_card_id(card)["id"], card["front"], card["back"], card.get("ease_factor", 2.5),
+                card.get("interval", 0), card.get("repetitions", 0), card["next_review"],
+                card.get("created", card["next_review"]), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    def _card(self, row):
+        card = dict(zip(CARD_FIELDS, row[:len(CARD_FIELDS)]))
+        if row[-1]:
+            card.update(json.loads(row[-1]))
+        return card
+
+    def migrate_json(self, legacy_path):
+        if not Path(legacy_path).exists():
+            return 0
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if done is not None or self._conn.execute("SELECT 1 FROM cards LIMIT 1").fetchone():
+                return 0
+        cards = JsonDeckStorage(legacy_path).load()
+        with self._lock, self._conn:
+            self._insert(cards, ignore_duplicates=True)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                               (os.path.abspath(legacy_path),))
+        return len(cards)
+
+    def _insert(self, cards, ignore_duplicates=False):
+        self._conn.executemany(
+            f"INSERT {'OR IGNORE ' if ignore_duplicates else ''}INTO cards ({', '.join(CARD_COLUMNS)}, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [self._row(card) for card in cards]
+        )
+
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CARD_COLUMNS)}, extra FROM cards ORDER BY id"
+            ).fetchall()
+        return [self._card(row) for row in rows]
+
+    def due(self, now_iso):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CARD_COLUMNS)}, extra FROM cards WHERE next_review <= ? ORDER BY next_review",
+                (now_iso,)
+            ).fetchall()
+        return [self._card(row) for row in rows]
+
+    def save_all(self, cards):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards")
+            self._insert(cards)
+
+    def apply(self, added, updated, all_cards=None):
+        with self._lock, self._conn:
+            self._insert(added)
+            self._conn.executemany(
+                "UPDATE cards SET front = ?, back = ?, ease_factor = ?, interval = ?, repetitions = ?, "
+                "next_review = ?, created = ?, extra = ? WHERE card_id = ?",
+                [(*self._row(card)[1:], card_id) for card_id, card in updated.items()]
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_deck_storage(path=DEFAULT_DECK_PATH):
+    if str(path).endswith(".json"):
+        return JsonDeckStorage(path)
+    return SqliteDeckStorage(path)
+
+
+def due_timestamp(card):
+    return to_micros(card["next_review"])
+
+
+class DueIndex:
+    def __init__(self, cards, resolve):
+        self.resolve = resolve
+        self.rebuild(cards)
+
+    def rebuild(self, cards):
+        if hasattr(cards, 'due_entries'):
+            entries = sorted(cards.due_entries())
+        else:
+            entries = sorted((due_timestamp(card), card["id"]) for card in cards)
+        self._times = [ts for ts, _ in entries]
+        self._keys = [key for _, key in entries]
+        self._due = dict(zip(self._keys, self._times))
+
+    def __len__(self):
+        return len(self._times)
+
+    def _remove(self, key):
+        ts = self._due.pop(key, None)
+        if ts is None:
+            return
+        i = self._position(ts, key)
+        del self._times[i]
+        del self._keys[i]
+
+    def _position(self, ts, key):
+        lo = bisect_left(self._times, ts)
+        hi = bisect_right(self._times, ts, lo)
+        return bisect_left(self._keys, key, lo, hi)
+
+    def _insert(self, ts, key):
+        i = self._position(ts, key)
+        self._times.insert(i, ts)
+        self._keys.insert(i, key)
+        self._due[key] = ts
+
+    def add(self, card):
+        key = card["id"]
+        self._remove(key)
+        self._insert(due_timestamp(card), key)
+
+    @staticmethod
+    def _timestamp(when):
+        if when is None:
+            when = datetime.now()
+        return to_micros(when) if isinstance(when, datetime) else when
+
+    def count_due(self, now=None):
+        return bisect_right(self._times, self._timestamp(now))
+
+    def due(self, now=None):
+        return [self.resolve(key) for key in self._keys[:self.count_due(now)]]
+
+    def between(self, start, end):
+        lo = bisect_right(self._times, self._timestamp(start))
+        hi = bisect_right(self._times, self._timestamp(end))
+        return [self.resolve(key) for key in self._keys[lo:hi]]
+
+    def count_between(self, start, end):
+        return max(0, bisect_right(self._times, self._timestamp(end)) -
+                   bisect_right(self._times, self._timestamp(start)))
+
+
+class DeckRepository:
+    def __init__(self, storage, flush_delay=0.05, compact=False, retry_delay=5.0):
+        self.storage = storage
+        self.flush_delay = flush_delay
+        self.retry_delay = retry_delay
+        self.flush_error = None
+        self.version = 0
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._added = {}
+        self._updated = {}
+        self._rewrite = False
+        self._timer = None
+        cards = storage.load()
+        if compact:
+            from Card_store import CompactCardList
+            cards = CompactCardList(cards)
+        self.deck = {"cards": cards}
+        self._reindex()
+        self.due_index = DueIndex(self.deck["cards"], self._resolve)
+
+    def _reindex(self):
+        cards = self.deck["cards"]
+        if hasattr(cards, 'column'):
+            ids, fronts = cards.column("id"), cards.column("front")
+        else:
+            ids = [ensure_card_id(card)["id"] for card in cards]
+            fronts = [card["front"] for card in cards]
+        self._positions = {card_id: i for i, card_id in enumerate(ids)}
+        self._fronts = {}
+        for front, card_id in zip(fronts, ids):
+            self._fronts.setdefault(normalize_front(front), card_id)
+
+    def _resolve(self, card_id):
+        return self.deck["cards"][self._positions[card_id]]
+
+    @property
+    def cards(self):
+        return self.deck["cards"]
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _changed(self, event, cards):
+        self.version += 1
+        if event == 'reset':
+            self._reindex()
+            self.due_index.rebuild(cards)
+        else:
+            for card in cards:
+                self.due_index.add(card)
+        for listener in list(self._listeners):
+            listener(event, cards)
+        self._schedule()
+
+    def _schedule(self, delay=None):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay if delay is None else delay, self._background_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _background_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error saving flashcards, retrying in {self.retry_delay:g}s: {e}", file=sys.stderr)
+            with self._lock:
+                self._schedule(self.retry_delay)
+
+    def get(self, card_id):
+        with self._lock:
+            i = self._positions.get(card_id)
+            return None if i is None else self.deck["cards"][i]
+
+    def find_by_front(self, front):
+        with self._lock:
+            card_id = self._fronts.get(normalize_front(front))
+            return None if card_id is None else self.get(card_id)
+
+    def add(self, cards, unique_fronts=False):
+        added = []
+        cards = [prepare_card(card) for card in cards]
+        with self._lock:
+            deck_cards = self.deck["cards"]
+            for card in cards:
+                front = normalize_front(card["front"])
+                if unique_fronts and front in self._fronts:
+                    continue
+                if not card.get("id") or card["id"] in self._positions:
+                    card["id"] = new_card_id()
+                self._positions[card["id"]] = len(deck_cards)
+                self._fronts.setdefault(front, card["id"])
+                deck_cards.append(card)
+                self._added[card["id"]] = card
+                added.append(card)
+            if added:
+                self._changed('add', added)
+        return added
+
+    def replace(self, old, new):
+        new = prepare_card(new)
+        with self._lock:
+            card_id = old.get("id")
+            if card_id is None:
+                card_id = self._fronts.get(normalize_front(old["front"]))
+            i = self._positions.get(card_id)
+            if i is None:
+                return None
+            new["id"] = card_id
+            self.deck["cards"][i] = new
+            if card_id in self._added:
+                self._added[card_id] = new
+            else:
+                self._updated[card_id] = new
+            self._changed('update', [new])
+        return new
+
+    def replace_all(self, cards):
+        if cards is not self.deck["cards"]:
+            cards = [prepare_card(card) for card in cards]
+        with self._lock:
+            if cards is not self.deck["cards"]:
+                self.deck["cards"][:] = cards
+            self._added.clear()
+            self._updated.clear()
+            self._rewrite = True
+            self._changed('reset', self.deck["cards"])
+
+    def clear(self):
+        self.replace_all([])
+
+    def due_cards(self, now=None):
+        with self._lock:
+            return self.due_index.due(now)
+
+    def count_due(self, now=None):
+        with self._lock:
+            return self.due_index.count_due(now)
+
+    def due_within(self, days, now=None):
+        now = now or datetime.now()
+        with self._lock:
+            return self.due_index.between(now, now + timedelta(days=days))
+
+    def count_due_within(self, days, now=None):
+        now = now or datetime.now()
+        with self._lock:
+            return self.due_index.count_between(now, now + timedelta(days=days))
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            try:
+                if self._rewrite:
+                    self.storage.save_all(self.deck["cards"])
+                elif self._added or self._updated:
+                    self.storage.apply(list(self._added.values()), self._updated, self.deck["cards"])
+            except Exception as e:
+                self.flush_error = e
+                raise
+            self.flush_error = None
+            self._added = {}
+            self._updated = {}
+            self._rewrite = False
+
+    def reload(self):
+        with self._lock:
+            self.flush()
+            self.deck["cards"][:] = self.storage.load()
+            self._changed('reset', self.deck["cards"])
+            return self.deck
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_deck_repository(path=DEFAULT_DECK_PATH, compact=COMPACT_DECKS):
+    key = os.path.abspath(path)
+    with _repositories_lock:
+        repository = _repositories.get(key)
+        if repository is None:
+            repository = _repositories[key] = DeckRepository(open_deck_storage(path), compact=compact)
+            atexit.register(repository.flush)
+        return repository
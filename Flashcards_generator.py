@@ -1,25 +1,24 @@
-import json
 import re
 from datetime import datetime, timedelta
-from pathlib import Path
 import random
+from Deck_storage import DEFAULT_DECK_PATH, get_deck_repository, new_card_id
 
 
 class FlashcardGenerator:
-    def __init__(self, notes_file=None, deck_file="flashcards.json"):
+    def __init__(self, notes_file=None, deck_file=DEFAULT_DECK_PATH):
         self.notes_file = notes_file
         self.deck_file = deck_file
-        self.deck = self.load_deck()
+        self.repository = get_deck_repository(deck_file)
+    
+    @property
+    def deck(self):
+        return self.repository.deck
     
     def load_deck(self):
-        if Path(self.deck_file).exists():
-            with open(self.deck_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {"cards": []}
+        return self.repository.reload()
     
     def save_deck(self):
-        with open(self.deck_file, 'w', encoding='utf-8') as f:
-            json.dump(self.deck, f, indent=2, ensure_ascii=False)
+        self.repository.replace_all(self.deck["cards"])
     
     def parse_notes(self, content=None):
         if content is None and self.notes_file:
@@ -62,6 +61,7 @@ class FlashcardGenerator:
     
     def _create_card(self, front, back, timestamp):
         return {
+            "id": new_card_id(),
             "front": front,
             "back": back,
             "ease_factor": 2.5,
@@ -79,40 +79,24 @@ class FlashcardGenerator:
         else:
             return 0
         
-        existing_fronts = {card["front"] for card in self.deck["cards"]}
-        added = 0
-        
-        for card in new_cards:
-            if card["front"] not in existing_fronts:
-                self.deck["cards"].append(card)
-                added += 1
-        
-        if added > 0:
-            self.save_deck()
-        
-        return added
+        return self.import_cards(new_cards)
+    
+    def import_cards(self, cards):
+        return len(self.repository.add(cards, unique_fronts=True))
     
     def add_manual_card(self, front, back):
         card = self._create_card(front, back, datetime.now().isoformat())
-        self.deck["cards"].append(card)
-        self.save_deck()
-        return card
+        return self.repository.add([card])[0]
     
     def get_all_cards(self):
         return self.deck.get("cards", [])
     
     def get_due_cards(self):
-        now = datetime.now()
-        due = []
-        for card in self.deck["cards"]:
-            next_review = datetime.fromisoformat(card["next_review"])
-            if next_review <= now:
-                due.append(card)
-        return due
+        return self.repository.due_cards()
     
     def get_card_stats(self):
         total = len(self.deck["cards"])
-        due = len(self.get_due_cards())
+        due = self.repository.count_due()
         mastered = total - due
         return {
             "total": total,
@@ -123,31 +107,29 @@ class FlashcardGenerator:
 
 
 class SpacedRepetition:
-    def __init__(self, deck_file="flashcards.json"):
+    def __init__(self, deck_file=DEFAULT_DECK_PATH):
         self.deck_file = deck_file
-        self.deck = self.load_deck()
+        self.repository = get_deck_repository(deck_file)
+    
+    @property
+    def deck(self):
+        return self.repository.deck
     
     def load_deck(self):
-        if Path(self.deck_file).exists():
-            with open(self.deck_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {"cards": []}
+        return self.repository.reload()
     
     def save_deck(self):
-        with open(self.deck_file, 'w', encoding='utf-8') as f:
-            json.dump(self.deck, f, indent=2, ensure_ascii=False)
+        self.repository.replace_all(self.deck["cards"])
     
     def get_due_cards(self):
-        now = datetime.now()
-        due = []
-        for card in self.deck["cards"]:
-            next_review = datetime.fromisoformat(card["next_review"])
-            if next_review <= now:
-                due.append(card)
-        return due
+        return self.repository.due_cards()
+    
+    def get_cards_due_within(self, days):
+        return self.repository.due_within(days)
+    
     def get_card_stats(self):  # ADD THIS METHOD
         total = len(self.deck["cards"])
-        due = len(self.get_due_cards())
+        due = self.repository.count_due()
         mastered = total - due
         return {
             "total": total,
@@ -180,11 +162,7 @@ class SpacedRepetition:
     
     def review_card(self, card, quality):
         updated_card = self.sm2_algorithm(card.copy(), quality)
-        for i, c in enumerate(self.deck["cards"]):
-            if c["front"] == card["front"] and c["back"] == card["back"]:
-                self.deck["cards"][i] = updated_card
-                break
-        self.save_deck()
+        self.repository.replace(card, updated_card)
         return updated_card
     
     def get_review_session(self, shuffle=True):
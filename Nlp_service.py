@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_SPACY_MODEL = "en_core_web_sm"
+DEFAULT_DOC_CACHE_PATH = "./.nlp_cache/docs.spacy"
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class NlpService:
+    def __init__(self, model_name=DEFAULT_SPACY_MODEL, max_docs=512):
+        self.model_name = model_name
+        self.max_docs = max_docs
+        self.hits = 0
+        self.misses = 0
+        self._nlp = None
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nlp(self):
+        with self._lock:
+            if self._nlp is None:
+                import spacy
+                self._nlp = spacy.load(self.model_name)
+            return self._nlp
+
+    def _disabled(self, disable):
+        names = self.nlp.pipe_names
+        return tuple(sorted(name for name in disable if name in names))
+
+    def _lookup(self, digest, disabled):
+        for key in ((digest, disabled), (digest, ())):
+            doc = self._docs.get(key)
+            if doc is not None:
+                self._docs.move_to_end(key)
+                return doc
+        return None
+
+    def _store(self, key, doc):
+        self._docs[key] = doc
+        self._docs.move_to_end(key)
+        while len(self._docs) > self.max_docs:
+            self._docs.popitem(last=False)
+
+    def parse(self, text, disable=()):
+        disabled = self._disabled(disable)
+        digest = text_hash(text)
+        with self._lock:
+            doc = self._lookup(digest, disabled)
+            if doc is not None:
+                self.hits += 1
+                return doc
+            self.misses += 1
+
+        doc = self.nlp(text, disable=disabled)
+        with self._lock:
+            self._store((digest, disabled), doc)
+        return doc
+
+    def pipe(self, texts, disable=(), **kwargs):
+        disabled = self._disabled(disable)
+        texts = list(texts)
+        digests = [text_hash(text) for text in texts]
+        docs = [None] * len(texts)
+        with self._lock:
+            for i, digest in enumerate(digests):
+                docs[i] = self._lookup(digest, disabled)
+            self.hits += sum(1 for doc in docs if doc is not None)
+
+        pending = [i for i, doc in enumerate(docs) if doc is None]
+        if pending:
+            parsed = self.nlp.pipe((texts[i] for i in pending), disable=disabled, **kwargs)
+            for i, doc in zip(pending, parsed):
+                docs[i] = doc
+            with self._lock:
+                self.misses += len(pending)
+                for i in pending:
+                    self._store((digests[i], disabled), docs[i])
+        return docs
+
+    def save(self, path=DEFAULT_DOC_CACHE_PATH):
+        with self._lock:
+            items = list(self._docs.items())
+        from spacy.tokens import DocBin
+        doc_bin = DocBin(store_user_data=True)
+        for (_, disabled), doc in items:
+            doc.user_data['nlp_service_disabled'] = list(disabled)
+            doc_bin.add(doc)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        doc_bin.to_disk(path)
+        return len(items)
+
+    def load(self, path=DEFAULT_DOC_CACHE_PATH):
+        if not os.path.exists(path):
+            return 0
+        from spacy.tokens import DocBin
+        docs = list(DocBin().from_disk(path).get_docs(self.nlp.vocab))
+        with self._lock:
+            for doc in docs:
+                disabled = tuple(doc.user_data.get('nlp_service_disabled', ()))
+                self._store((text_hash(doc.text), disabled), doc)
+        return len(docs)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"docs": len(self._docs), "hits": self.hits, "misses": self.misses}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_nlp_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = NlpService()
+        return _service
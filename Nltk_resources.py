@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import sys
+import threading
+
+RESOURCES = {
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+}
+VENDORED_DATA_DIR = os.environ.get("STUDYHUB_NLTK_DATA", "./nltk_data")
+DEFAULT_MANIFEST_PATH = "./.nlp_cache/nltk_manifest.json"
+
+
+class NltkResources:
+    def __init__(self, data_dir=VENDORED_DATA_DIR, manifest_path=DEFAULT_MANIFEST_PATH):
+        self.data_dir = data_dir
+        self.manifest_path = manifest_path
+        self._nltk = None
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=2)
+
+    @property
+    def nltk(self):
+        if self._nltk is None:
+            import nltk
+            data_dir = os.path.abspath(self.data_dir)
+            if os.path.isdir(data_dir) and data_dir not in nltk.data.path:
+                nltk.data.path.insert(0, data_dir)
+            self._nltk = nltk
+        return self._nltk
+
+    def locate(self, name):
+        recorded = self._manifest.get(name)
+        if recorded and os.path.exists(recorded):
+            return recorded
+        try:
+            location = str(self.nltk.data.find(RESOURCES[name]))
+        except LookupError:
+            location = None
+        if location:
+            self._manifest[name] = location
+        else:
+            self._manifest.pop(name, None)
+        try:
+            self._write_manifest()
+        except OSError:
+            pass
+        return location
+
+    def available(self, name):
+        return self.locate(name) is not None
+
+    def status(self):
+        return {name: self.locate(name) for name in RESOURCES}
+
+    def require(self, name):
+        if self.locate(name) is None:
+            raise LookupError(
+                f"NLTK resource '{name}' is not installed. Run "
+                f"'python Nltk_resources.py download --dir {self.data_dir}' on a connected "
+                f"machine and copy the directory here, or set STUDYHUB_NLTK_DATA."
+            )
+
+    def load(self, name):
+        with self._lock:
+            if name not in self._loaded:
+                self.require(name)
+                reader = getattr(self.nltk.corpus, name)
+                reader.ensure_loaded()
+                self._loaded[name] = reader
+            return self._loaded[name]
+
+    def stopwords(self, language='english'):
+        try:
+            return frozenset(self.load('stopwords').words(language))
+        except LookupError:
+            from spacy.lang.en.stop_words import STOP_WORDS
+            return frozenset(STOP_WORDS)
+
+    def download(self, names=None, data_dir=None):
+        data_dir = data_dir or self.data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        results = {}
+        for name in names or RESOURCES:
+            results[name] = self.nltk.download(name, download_dir=data_dir, quiet=True)
+        self.data_dir = data_dir
+        data_dir = os.path.abspath(data_dir)
+        if data_dir not in self.nltk.data.path:
+            self.nltk.data.path.insert(0, data_dir)
+        self._manifest = {}
+        return results
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+
+def get_nltk_resources():
+    global _resources
+    with _resources_lock:
+        if _resources is None:
+            _resources = NltkResources()
+        return _resources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or vendor the NLTK data used by Study Hub")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Report where each required resource was found")
+    download = subparsers.add_parser("download", help="Download required resources into a vendored directory")
+    download.add_argument("--dir", default=VENDORED_DATA_DIR)
+    args = parser.parse_args(argv)
+
+    resources = get_nltk_resources()
+    if args.command == "download":
+        for name, ok in resources.download(data_dir=args.dir).items():
+            print(f"{name}: {'ok' if ok else 'failed'}", file=sys.stderr)
+    missing = 0
+    for name, location in resources.status().items():
+        print(f"{name}: {location or 'missing'}")
+        missing += location is None
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
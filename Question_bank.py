@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from Summary_cache import normalize_text
+
+DEFAULT_BANK_PATH = "./.quiz_cache/questions.sqlite"
+QUESTION_TYPES = ('mcq', 'truefalse', 'fillblank')
+SCHEMA_VERSION = 2
+
+
+def content_hash(text):
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def split_paragraphs(text):
+    return [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+
+
+class QuestionBank:
+    def __init__(self, path=DEFAULT_BANK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS questions;
+                DROP TABLE IF EXISTS paragraphs;
+            """)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_hash TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                paragraph_hash TEXT NOT NULL,
+                PRIMARY KEY (doc_hash, position)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS paragraphs (
+                paragraph_hash TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                processed REAL NOT NULL,
+                PRIMARY KEY (paragraph_hash, difficulty)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                paragraph_hash TEXT NOT NULL,
+                sentence_hash TEXT NOT NULL,
+                type TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                UNIQUE (paragraph_hash, sentence_hash, type, difficulty)
+            );
+            CREATE INDEX IF NOT EXISTS idx_questions_paragraph ON questions(paragraph_hash, difficulty, type);
+            CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions(topic, difficulty, type);
+            CREATE INDEX IF NOT EXISTS idx_questions_type ON questions(type, difficulty);
+        """)
+        self._conn.commit()
+
+    def document(self, doc_hash):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT paragraph_hash FROM documents WHERE doc_hash = ? ORDER BY position", (doc_hash,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def add_document(self, doc_hash, paragraph_hashes):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE doc_hash = ?", (doc_hash,))
+            self._conn.executemany(
+                "INSERT INTO documents (doc_hash, position, paragraph_hash) VALUES (?, ?, ?)",
+                [(doc_hash, i, h) for i, h in enumerate(paragraph_hashes)]
+            )
+            self._conn.commit()
+
+    def processed(self, paragraph_hashes, difficulty):
+        paragraph_hashes = list(paragraph_hashes)
+        if not paragraph_hashes:
+            return set()
+        marks = ','.join('?' * len(paragraph_hashes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT paragraph_hash FROM paragraphs WHERE difficulty = ? AND paragraph_hash IN ({marks})",
+                [difficulty, *paragraph_hashes]
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add_paragraph(self, paragraph_hash, difficulty, questions):
+        rows = []
+        for question in questions:
+            payload = {k: v for k, v in question.items() if k != 'id'}
+            rows.append((paragraph_hash, question['sentence_hash'], question['type'], difficulty,
+                         question['topic'].lower(), json.dumps(payload, ensure_ascii=False)))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO questions (paragraph_hash, sentence_hash, type, difficulty, topic, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO paragraphs (paragraph_hash, difficulty, processed) VALUES (?, ?, ?)",
+                (paragraph_hash, difficulty, time.time())
+            )
+            self._conn.commit()
+
+    def query(self, paragraph_hashes, difficulty, question_type=None, topics=None):
+        paragraph_hashes = list(paragraph_hashes)
+        if not paragraph_hashes:
+            return []
+        sql = (f"SELECT payload FROM questions WHERE difficulty = ? "
+               f"AND paragraph_hash IN ({','.join('?' * len(paragraph_hashes))})")
+        params = [difficulty, *paragraph_hashes]
+        if question_type and question_type != 'mixed':
+            sql += " AND type = ?"
+            params.append(question_type)
+        if topics:
+            topics = sorted({topic.lower() for topic in topics})
+            sql += f" AND topic IN ({','.join('?' * len(topics))})"
+            params.extend(topics)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": self._conn.execute("SELECT COUNT(DISTINCT doc_hash) FROM documents").fetchone()[0],
+                "paragraphs": self._conn.execute("SELECT COUNT(*) FROM paragraphs").fetchone()[0],
+                "questions": self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
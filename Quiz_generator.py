@@ -1,43 +1,159 @@
-import spacy
+import argparse
+import json
+import multiprocessing
+import os
 import random
 import re
-from collections import defaultdict
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from typing import List, Dict, Tuple
-import nltk
-from nltk.corpus import wordnet
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.tag import pos_tag
+from Nlp_service import get_nlp_service
+from Nltk_resources import get_nltk_resources
+from Question_bank import QUESTION_TYPES, content_hash, split_paragraphs
+from Weakness_model import get_weakness_model
+from Wordnet_lookup import get_wordnet_lookup
+
+QUIZ_PARSE_DISABLED = ('lemmatizer',)
+BANK_PARSE_BATCH = 16
+
+GENERIC_DISTRACTORS = {
+    'PERSON': ['John Smith', 'Jane Doe', 'Dr. Williams'],
+    'ORG': ['Global Corporation', 'International Institute', 'National Association'],
+    'GPE': ['New York', 'London', 'Tokyo'],
+    'DATE': ['1990', '2005', '2020'],
+    'CARDINAL': ['100', '500', '1000']
+}
+
+
+class DistractorIndex:
+    def __init__(self, docs):
+        self.docs = list(docs) if isinstance(docs, (list, tuple)) else [docs]
+        self._doc_ids = {id(doc) for doc in self.docs}
+        entity_counts = defaultdict(Counter)
+        self.entity_labels = {}
+        for ent in (ent for doc in self.docs for ent in doc.ents):
+            entity_counts[ent.label_][ent.text] += 1
+            self.entity_labels.setdefault(ent.text.lower(), ent.label_)
+        self.entities = {label: [text for text, _ in counts.most_common()]
+                         for label, counts in entity_counts.items()}
+
+        phrase_counts = Counter()
+        for chunk in (chunk for doc in self.docs for chunk in doc.noun_chunks):
+            tokens = [t for t in chunk if t.pos_ != 'DET' and not t.is_stop]
+            if tokens:
+                phrase_counts[' '.join(t.text for t in tokens)] += 1
+        self.phrases = sorted((count, phrase) for phrase, count in phrase_counts.items())
+        self.phrase_counts = phrase_counts
+
+    def covers(self, doc):
+        return id(doc) in self._doc_ids
+
+    def label_of(self, answer):
+        return self.entity_labels.get(answer.lower())
+
+    def same_label(self, answer, label, limit=3):
+        answer_lower = answer.lower()
+        result = []
+        for text in self.entities.get(label, ()):
+            if text.lower() != answer_lower:
+                result.append(text)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def frequency_neighbours(self, answer, limit=3):
+        if not self.phrases:
+            return []
+        answer_lower = answer.lower()
+        position = bisect_left(self.phrases, (self.phrase_counts.get(answer, 1), answer))
+        result = []
+        left, right = position - 1, position
+        while len(result) < limit and (left >= 0 or right < len(self.phrases)):
+            for i in (right, left):
+                if 0 <= i < len(self.phrases) and len(result) < limit:
+                    phrase = self.phrases[i][1]
+                    if phrase.lower() != answer_lower and answer_lower not in phrase.lower():
+                        result.append(phrase)
+            left -= 1
+            right += 1
+        return result
+
+
+def topic_index(sentences):
+    index = defaultdict(list)
+    for i, sent in enumerate(sentences):
+        topics = {ent.text.lower() for ent in sent.ents}
+        topics.update(token.text.lower() for token in sent
+                      if token.pos_ in ['NOUN', 'PROPN'] and not token.is_stop)
+        for topic in topics:
+            index[topic].append(i)
+    return index
 
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('wordnet')
-nltk.download('stopwords')
 
 class QuizGenerator:
-    def __init__(self):
+    def __init__(self, weakness=None):
+        self.nlp_service = get_nlp_service()
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = self.nlp_service.nlp
         except:
             print("Please install spaCy model")
             raise
         
-        self.struggled_topics = []
-        self.stopwords = set(nltk.corpus.stopwords.words('english'))
+        self._weakness = weakness
+        self._stopwords = None
+        self.distractor_index = None
+        self.wordnet = get_wordnet_lookup()
+        self.wordnet.warm_async()
     
-    def extract_key_sentences(self, text: str, difficulty: str = 'medium') :
-        doc = self.nlp(text)
-        sentences = [sent.text.strip() for sent in doc.sents]
+    @property
+    def weakness(self):
+        if self._weakness is None:
+            self._weakness = get_weakness_model()
+        return self._weakness
+
+    @weakness.setter
+    def weakness(self, model):
+        self._weakness = model
+
+    @property
+    def struggled_topics(self):
+        return self.weakness.top_topics()
+
+    def sentence_weights(self, sentences, scores):
+        weights = [0.0] * len(sentences)
+        for topic, ids in topic_index(sentences).items():
+            score = scores.get(topic)
+            if score:
+                for i in ids:
+                    weights[i] += score
+        return weights
+
+    @property
+    def stopwords(self):
+        if self._stopwords is None:
+            self._stopwords = get_nltk_resources().stopwords('english')
+        return self._stopwords
+
+    def extract_key_sentences(self, text, difficulty: str = 'medium') :
+        if isinstance(text, str):
+            doc = self.nlp_service.parse(text, disable=QUIZ_PARSE_DISABLED)
+        else:
+            doc = text
+        sentences = [sent for sent in doc.sents if sent.text.strip()]
         scored_sentences = []
         for sent in sentences:
-            sent_doc = self.nlp(sent)
+            sent_text = sent.text.strip().lower()
             score = 0
-            score += len(sent_doc.ents) * 2
-            if any(token.like_num for token in sent_doc):
+            score += len(sent.ents) * 2
+            if any(token.like_num for token in sent):
                 score += 1
-            word_count = len([t for t in sent_doc if not t.is_punct])
+            word_count = len([t for t in sent if not t.is_punct and not t.is_space])
             if 8 <= word_count <= 25:
                 score += 2
-            if any(pattern in sent.lower() for pattern in ['is', 'are', 'refers to', 'means', 'defined as']):
+            if any(pattern in sent_text for pattern in ['is', 'are', 'refers to', 'means', 'defined as']):
                 score += 3
             scored_sentences.append((sent, score))
         scored_sentences.sort(key=lambda x: x[1], reverse=True)
@@ -49,29 +165,37 @@ class QuizGenerator:
         
         return [s[0] for s in scored_sentences[:num_sentences[difficulty]]]
     
+    def as_span(self, sentence):
+        if isinstance(sentence, str):
+            doc = self.nlp_service.parse(sentence, disable=QUIZ_PARSE_DISABLED)
+            return doc[:]
+        return sentence
+
     def generate_mcq(self, sentence, difficulty = 'medium') :
-        doc = self.nlp(sentence)
+        doc = self.as_span(sentence)
+        offset = doc.start
         candidates = []
         for ent in doc.ents:
             if ent.label_ in ['PERSON', 'ORG', 'GPE', 'DATE', 'CARDINAL', 'PRODUCT']:
-                candidates.append((ent.text, ent.start, ent.end, 'entity'))
+                candidates.append((ent.text, ent.start - offset, ent.end - offset, 'entity'))
         for token in doc:
             if token.pos_ in ['NOUN', 'PROPN'] and not token.is_stop:
                 if token.dep_ in ['nsubj', 'dobj', 'pobj']:
-                    candidates.append((token.text, token.i, token.i + 1, 'noun'))
+                    candidates.append((token.text, token.i - offset, token.i - offset + 1, 'noun'))
         
-        if not candidates:
-            return None
-        if difficulty == 'hard' and len(candidates) > 1:
-            answer_text, start, end, ans_type = candidates[-1]
+        if difficulty == 'hard':
+            candidates.reverse()
+        for answer_text, start, end, ans_type in candidates:
+            distractors = self.generate_distractors(answer_text, ans_type, doc, difficulty)
+            if len(distractors) >= 3:
+                break
         else:
-            answer_text, start, end, ans_type = candidates[0]
+            return None
         question_tokens = [token.text for token in doc]
         for i in range(start, end):
             question_tokens[i] = "______"
-        question = ' '.join(question_tokens)
+        question = ' '.join(t for t in question_tokens if t.strip())
         question = re.sub(r'\s+([.,!?])', r'\1', question)
-        distractors = self.generate_distractors(answer_text, ans_type, doc, difficulty)
         options = [answer_text] + distractors[:3]
         random.shuffle(options)
         
@@ -85,45 +209,43 @@ class QuizGenerator:
             'difficulty': difficulty
         }
     
+    def index_for(self, doc):
+        source = getattr(doc, 'doc', doc)
+        if self.distractor_index is None or not self.distractor_index.covers(source):
+            self.distractor_index = DistractorIndex(source)
+        return self.distractor_index
+
     def generate_distractors(self, answer: str, ans_type: str, doc, difficulty: str) -> List[str]:
-        distractors = []
+        index = self.index_for(doc)
         answer_lower = answer.lower()
-        if ans_type == 'entity':
-            for ent in doc.ents:
-                if ent.text.lower() != answer_lower and ent.text not in distractors:
-                    distractors.append(ent.text)
-        try:
-            synsets = wordnet.synsets(answer.replace(' ', '_'))
-            for syn in synsets[:3]:
-                for lemma in syn.lemmas()[:2]:
-                    word = lemma.name().replace('_', ' ')
-                    if word.lower() != answer_lower and word not in distractors:
-                        distractors.append(word.title())
-        except:
-            pass
-        for token in doc:
-            if token.pos_ in ['NOUN', 'PROPN']:
-                if token.text.lower() != answer_lower and token.text not in distractors:
-                    distractors.append(token.text)
-        generic_distractors = {
-            'PERSON': ['John Smith', 'Jane Doe', 'Dr. Williams'],
-            'ORG': ['Global Corporation', 'International Institute', 'National Association'],
-            'GPE': ['New York', 'London', 'Tokyo'],
-            'DATE': ['1990', '2005', '2020'],
-            'CARDINAL': ['100', '500', '1000']
-        }
-        
-        if ans_type == 'entity':
-            for ent in doc.ents:
-                if ent.label_ in generic_distractors:
-                    distractors.extend(generic_distractors[ent.label_])
-                    break
-        distractors = list(set([d for d in distractors if d.lower() != answer_lower]))
-        
-        return distractors[:3] if len(distractors) >= 3 else distractors + ['Option A', 'Option B', 'Option C'][:3-len(distractors)]
+        distractors = []
+        seen = {answer_lower}
+
+        def add(candidates):
+            for candidate in candidates:
+                if len(distractors) >= 3:
+                    return
+                if candidate.lower() not in seen:
+                    seen.add(candidate.lower())
+                    distractors.append(candidate)
+
+        label = index.label_of(answer) if ans_type == 'entity' else None
+        if label:
+            add(index.same_label(answer, label))
+        if difficulty == 'easy':
+            add(self.wordnet.siblings(answer))
+            add(index.frequency_neighbours(answer))
+        else:
+            add(index.frequency_neighbours(answer))
+            add(self.wordnet.siblings(answer))
+        if label:
+            add(GENERIC_DISTRACTORS.get(label, ()))
+
+        return distractors
     
-    def generate_truefalse(self, sentence: str, difficulty: str = 'medium') -> Dict:
-        doc = self.nlp(sentence)
+    def generate_truefalse(self, sentence, difficulty: str = 'medium') -> Dict:
+        doc = self.as_span(sentence)
+        sentence = doc.text.strip()
         if random.random() < 0.5:
             false_statement = self.create_false_statement(sentence, doc, difficulty)
             if false_statement:
@@ -170,25 +292,21 @@ class QuizGenerator:
         return None
     
     def get_antonyms(self, word) :
-        antonyms = []
-        for syn in wordnet.synsets(word):
-            for lemma in syn.lemmas():
-                if lemma.antonyms():
-                    antonyms.append(lemma.antonyms()[0].name())
-        return antonyms
+        return list(self.wordnet.antonyms(word))
     
     def generate_fillblank(self, sentence, difficulty= 'medium') :
-        doc = self.nlp(sentence)
+        doc = self.as_span(sentence)
+        offset = doc.start
         candidates = []
         for ent in doc.ents:
-            candidates.append((ent.text, ent.start, ent.end, 'high'))
+            candidates.append((ent.text, ent.start - offset, ent.end - offset, 'high'))
         
         for token in doc:
             if token.pos_ in ['NOUN', 'PROPN'] and not token.is_stop:
                 if token.dep_ in ['nsubj', 'dobj']:
-                    candidates.append((token.text, token.i, token.i + 1, 'medium'))
+                    candidates.append((token.text, token.i - offset, token.i - offset + 1, 'medium'))
             elif token.pos_ == 'ADJ' and difficulty == 'hard':
-                candidates.append((token.text, token.i, token.i + 1, 'low'))
+                candidates.append((token.text, token.i - offset, token.i - offset + 1, 'low'))
         
         if not candidates:
             return None
@@ -199,7 +317,7 @@ class QuizGenerator:
             candidates = [c for c in candidates if c[3] != 'high']
         
         if not candidates:
-            candidates = [(token.text, token.i, token.i + 1, 'medium') 
+            candidates = [(token.text, token.i - offset, token.i - offset + 1, 'medium') 
                          for token in doc if token.pos_ == 'NOUN']
         
         if not candidates:
@@ -210,7 +328,7 @@ class QuizGenerator:
         question_tokens = [token.text for token in doc]
         for i in range(start, end):
             question_tokens[i] = "___"
-        question = ' '.join(question_tokens)
+        question = ' '.join(t for t in question_tokens if t.strip())
         question = re.sub(r'\s+([.,!?])', r'\1', question)
         
         return {
@@ -235,16 +353,20 @@ class QuizGenerator:
             return max(topic_counts, key=topic_counts.get)
         return "General"
     
-    def generate_quiz(self,content,question_type = 'mixed',difficulty = 'medium',num_questions = 5,personalized = False) :
+    def generate_quiz(self,content,question_type = 'mixed',difficulty = 'medium',num_questions = 5,personalized = False,
+                      on_progress=None, weakness=None) :
+        from Sentence_selector import SentenceSelector
+        if isinstance(content, str):
+            content = self.nlp_service.parse(content, disable=QUIZ_PARSE_DISABLED)
+        self.distractor_index = DistractorIndex(content)
         sentences = self.extract_key_sentences(content, difficulty)
-        
-        if personalized and self.struggled_topics:
-            filtered = []
-            for sent in sentences:
-                if any(topic.lower() in sent.lower() for topic in self.struggled_topics):
-                    filtered.append(sent)
-            if filtered:
-                sentences = filtered
+        weights = None
+        if personalized:
+            scores = (weakness or self.weakness).scores()
+            if scores:
+                weights = self.sentence_weights(sentences, scores)
+                if not any(weights):
+                    weights = None
         
         questions = []
         question_id = 1
@@ -255,28 +377,158 @@ class QuizGenerator:
         else:
             type_distribution = [question_type] * num_questions
       
-        for qtype in type_distribution:
-            if not sentences:
-                break
-            
-            sent = random.choice(sentences)
-            sentences.remove(sent)
-            
+        selector = SentenceSelector(sentences, weights=weights)
+        generators = {
+            'mcq': self.generate_mcq,
+            'truefalse': self.generate_truefalse,
+            'fillblank': self.generate_fillblank
+        }
+        for step, qtype in enumerate(type_distribution):
+            if on_progress:
+                on_progress(step, len(type_distribution))
             question = None
-            if qtype == 'mcq':
-                question = self.generate_mcq(sent, difficulty)
-            elif qtype == 'truefalse':
-                question = self.generate_truefalse(sent, difficulty)
-            elif qtype == 'fillblank':
-                question = self.generate_fillblank(sent, difficulty)
-            
-            if question:
-                question['id'] = question_id
-                questions.append(question)
-                question_id += 1
+            while question is None:
+                sent = selector.pop()
+                if sent is None:
+                    break
+                question = generators[qtype](sent, difficulty)
+            if question is None:
+                break
+            question['id'] = question_id
+            questions.append(question)
+            question_id += 1
         
+        if on_progress:
+            on_progress(len(type_distribution), len(type_distribution))
         return {'questions': questions}
+
+    def paragraph_questions(self, doc, difficulty='medium', index=None):
+        self.distractor_index = index if index is not None and index.covers(doc) else DistractorIndex(doc)
+        generators = {
+            'mcq': self.generate_mcq,
+            'truefalse': self.generate_truefalse,
+            'fillblank': self.generate_fillblank
+        }
+        for sent in self.extract_key_sentences(doc, difficulty):
+            sentence_hash = content_hash(sent.text)
+            for qtype in QUESTION_TYPES:
+                question = generators[qtype](sent, difficulty)
+                if question:
+                    question['sentence_hash'] = sentence_hash
+                    yield question
+
+    def generate_quiz_from_bank(self, bank, content, question_type='mixed', difficulty='medium',
+                                num_questions=5, personalized=False, on_progress=None, weakness=None):
+        doc_hash = content_hash(content)
+        paragraphs = split_paragraphs(content)
+        hashes = bank.document(doc_hash)
+        if not hashes:
+            hashes = [content_hash(p) for p in paragraphs]
+            bank.add_document(doc_hash, hashes)
+
+        processed = bank.processed(hashes, difficulty)
+        pending = {}
+        for paragraph_hash, paragraph in zip(hashes, paragraphs):
+            if paragraph_hash not in processed:
+                pending.setdefault(paragraph_hash, paragraph)
+        pending = list(pending.items())
+        if pending:
+            unique = list(dict.fromkeys(paragraphs))
+            total = len(unique) + len(pending)
+            parsed = {}
+            for start in range(0, len(unique), BANK_PARSE_BATCH):
+                if on_progress:
+                    on_progress(start, total)
+                batch = unique[start:start + BANK_PARSE_BATCH]
+                parsed.update(zip(batch, self.nlp_service.pipe(batch, disable=QUIZ_PARSE_DISABLED)))
+            index = DistractorIndex(list(parsed.values()))
+            for step, (paragraph_hash, paragraph) in enumerate(pending):
+                if on_progress:
+                    on_progress(len(unique) + step, total)
+                bank.add_paragraph(paragraph_hash, difficulty,
+                                   self.paragraph_questions(parsed[paragraph], difficulty, index))
+            if on_progress:
+                on_progress(total, total)
+
+        scores = (weakness or self.weakness).scores() if personalized else {}
+        candidates = bank.query(hashes, difficulty, question_type)
+        return {'questions': self.assemble_quiz(candidates, question_type, num_questions, scores)}
+
+    def assemble_quiz(self, candidates, question_type='mixed', num_questions=5, topic_scores=None):
+        from Sentence_selector import weighted_order
+        by_type = defaultdict(list)
+        for question in candidates:
+            by_type[question['type']].append(question)
+        for qtype, pool in by_type.items():
+            if topic_scores:
+                by_type[qtype] = weighted_order(pool, [topic_scores.get(q['topic'], 0.0) for q in pool])
+            else:
+                random.shuffle(pool)
+
+        if question_type == 'mixed':
+            type_distribution = [QUESTION_TYPES[i % 3] for i in range(num_questions)]
+            random.shuffle(type_distribution)
+        else:
+            type_distribution = [question_type] * num_questions
+
+        questions = []
+        used = set()
+        for qtype in type_distribution:
+            fallbacks = QUESTION_TYPES if question_type == 'mixed' else ()
+            for pool in [by_type[qtype]] + [by_type[t] for t in fallbacks if t != qtype]:
+                while pool and pool[-1]['sentence_hash'] in used:
+                    pool.pop()
+                if pool:
+                    break
+            if not pool:
+                continue
+            question = dict(pool.pop())
+            used.add(question['sentence_hash'])
+            question['id'] = len(questions) + 1
+            questions.append(question)
+        return questions
     
+    def iter_question_bank(self, documents, question_type='mixed', difficulty='medium',
+                           num_questions=10, n_process=1, batch_size=32, workers=None):
+        workers = workers or os.cpu_count() or 1
+        options = {
+            'question_type': question_type,
+            'difficulty': difficulty,
+            'num_questions': num_questions
+        }
+        items = ((doc, i) if isinstance(doc, str) else (doc[1], doc[0])
+                 for i, doc in enumerate(documents))
+        docs = self.nlp.pipe(items, as_tuples=True, n_process=n_process,
+                             batch_size=batch_size, disable=list(QUIZ_PARSE_DISABLED))
+
+        if workers == 1:
+            for doc, doc_id in docs:
+                yield {'document_id': doc_id, **self.generate_quiz(doc, **options)}
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_bank_worker,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending = set()
+            for doc, doc_id in docs:
+                pending.add(pool.submit(_bank_worker, doc_id, doc.to_bytes(), options))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def generate_question_bank(self, documents, output_path, **options):
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in self.iter_question_bank(documents, **options):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                count += 1
+        return count
+
     def take_quiz(self, quiz) :
         answers = {}
         
@@ -316,59 +568,194 @@ class QuizGenerator:
                 answer = input("\nYour answer: ").strip()
                 answers[question['id']] = answer
         
-        return self.grade_quiz(quiz, answers)
+        graded = self.grade_quiz(quiz, answers)
+        self.print_results(graded)
+        return graded
     
     def grade_quiz(self, quiz, answers) :
+        from Quiz_grading import exact_answer, grade_batch
+        questions = quiz['questions']
+        graded = grade_batch(quiz, {q['id']: [answers.get(q['id'], "")] for q in questions},
+                             fuzzy_threshold=None, normalizer=exact_answer)
+        correct = graded['correct'][0].tolist() if questions else []
+        self.weakness.record_many((q['topic'], ok) for q, ok in zip(questions, correct))
+
         results = []
-        correct_count = 0
-        
-        print("\n" + "="*60)
-        print("RESULTS")
-        print("="*60 + "\n")
-        
-        for question in quiz['questions']:
-            user_answer = answers.get(question['id'], "")
-            correct_answer = question['correct_answer']
-            
-            is_correct = user_answer.lower().strip() == correct_answer.lower().strip()
-            
-            if is_correct:
-                correct_count += 1
-                status = "✓ CORRECT"
-            else:
-                status = "✗ INCORRECT"
-                if question['topic'] not in self.struggled_topics:
-                    self.struggled_topics.append(question['topic'])
-            
+        for question, is_correct in zip(questions, correct):
             results.append({
                 'question': question['question'],
-                'your_answer': user_answer,
-                'correct_answer': correct_answer,
+                'your_answer': answers.get(question['id'], ""),
+                'correct_answer': question['correct_answer'],
                 'correct': is_correct,
                 'explanation': question['explanation'],
                 'topic': question['topic']
             })
-            
-            print(f"Q: {question['question']}")
-            print(f"Your answer: {user_answer}")
-            print(f"Correct answer: {correct_answer}")
-            print(f"Status: {status}")
-            print(f"Explanation: {question['explanation']}\n")
-        
-        score = (correct_count / len(quiz['questions'])) * 100
-        
-        print("="*60)
-        print(f"Final Score: {correct_count}/{len(quiz['questions'])} ({score:.1f}%)")
-        print("="*60)
-        
-        if self.struggled_topics:
-            print(f"\nTopics to review: {', '.join(set(self.struggled_topics[-5:]))}")
-        
+        correct_count = sum(correct)
         return {
             'results': results,
             'score': correct_count,
-            'total': len(quiz['questions']),
-            'percentage': score
+            'total': len(questions),
+            'percentage': (correct_count / len(questions)) * 100 if questions else 0.0
         }
 
+    def print_results(self, graded):
+        print("\n" + "="*60)
+        print("RESULTS")
+        print("="*60 + "\n")
+
+        for result in graded['results']:
+            print(f"Q: {result['question']}")
+            print(f"Your answer: {result['your_answer']}")
+            print(f"Correct answer: {result['correct_answer']}")
+            print(f"Status: {'✓ CORRECT' if result['correct'] else '✗ INCORRECT'}")
+            print(f"Explanation: {result['explanation']}\n")
+
+        print("="*60)
+        print(f"Final Score: {graded['score']}/{graded['total']} ({graded['percentage']:.1f}%)")
+        print("="*60)
+
+        struggled_topics = self.struggled_topics
+        if struggled_topics:
+            print(f"\nTopics to review: {', '.join(struggled_topics[:5])}")
+
+_bank_generator = None
+
+
+def _init_bank_worker():
+    global _bank_generator
+    random.seed()
+    _bank_generator = QuizGenerator()
+
+
+def _bank_worker(doc_id, doc_bytes, options):
+    from spacy.tokens import Doc
+    doc = Doc(_bank_generator.nlp.vocab).from_bytes(doc_bytes)
+    return {'document_id': doc_id, **_bank_generator.generate_quiz(doc, **options)}
+
+
+def _read_documents(path, text_field):
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if line.strip():
+                record = json.loads(line)
+                yield record.get('id', i), record[text_field]
+
+
+def _legacy_parse_pass(nlp, text, num_questions):
+    runs = 1
+    doc = nlp(text)
+    sentences = [sent.text.strip() for sent in doc.sents]
+    for sent in sentences:
+        nlp(sent)
+        runs += 1
+    for sent in sentences[:num_questions]:
+        nlp(sent)
+        runs += 1
+    return runs
+
+
+def benchmark_parsing(text, num_questions=20, difficulty='hard'):
+    generator = QuizGenerator()
+    service = generator.nlp_service
+
+    service.clear()
+    started = time.perf_counter()
+    legacy_runs = _legacy_parse_pass(generator.nlp, text, num_questions)
+    legacy_seconds = time.perf_counter() - started
+
+    service.clear()
+    started = time.perf_counter()
+    sentences = generator.extract_key_sentences(text, difficulty)
+    generators = [generator.generate_mcq, generator.generate_truefalse, generator.generate_fillblank]
+    for i, sent in enumerate(sentences[:num_questions]):
+        generators[i % 3](sent, difficulty)
+    span_seconds = time.perf_counter() - started
+
+    return {
+        "sentences": len(sentences),
+        "before_pipeline_runs": legacy_runs,
+        "before_parse_seconds": legacy_seconds,
+        "after_pipeline_runs": service.stats()["misses"],
+        "after_total_seconds": span_seconds
+    }
+
+
+def _run_bench(args):
+    with open(args.chapter, 'r', encoding='utf-8') as f:
+        text = f.read()
+    report = benchmark_parsing(text, num_questions=args.questions, difficulty=args.difficulty)
+    print(f"Sentences: {report['sentences']}")
+    print(f"Before: {report['before_pipeline_runs']} pipeline runs, "
+          f"{report['before_parse_seconds']:.2f}s spent parsing alone")
+    print(f"After:  {report['after_pipeline_runs']} pipeline runs, "
+          f"{report['after_total_seconds']:.2f}s including question generation")
+
+
+def _run_bank(args):
+    generator = QuizGenerator()
+    started = time.perf_counter()
+    count = generator.generate_question_bank(
+        _read_documents(args.input, args.text_field), args.output,
+        question_type=args.type, difficulty=args.difficulty, num_questions=args.questions,
+        n_process=args.n_process, batch_size=args.batch_size, workers=args.workers
+    )
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Generated question sets for {count} documents in {elapsed:.1f}s ({rate:.2f} docs/sec)",
+          file=sys.stderr)
+
+
+def _run_grade(args):
+    from Quiz_grading import grade_batch
+    with open(args.quiz, 'r', encoding='utf-8') as f:
+        quiz = json.load(f)
+    with open(args.answers, 'r', encoding='utf-8') as f:
+        submissions = json.load(f)
+    answers = {int(k) if k.isdigit() else k: v for k, v in submissions['answers'].items()}
+    graded = grade_batch(quiz, answers, submissions.get('student_ids'), fuzzy_threshold=args.fuzzy_threshold)
+    report = {
+        'summary': graded['summary'],
+        'per_question': graded['per_question'],
+        'per_topic': graded['per_topic'],
+        'students': [{'id': sid, 'score': int(score), 'percentage': float(pct)}
+                     for sid, score, pct in zip(graded['student_ids'], graded['scores'], graded['percentages'])]
+    }
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StudyHub quiz generator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("bench", help="Compare per-sentence re-parsing with parse-once spans")
+    bench.add_argument("chapter", help="Plain-text chapter to generate questions from")
+    bench.add_argument("--questions", type=int, default=20)
+    bench.add_argument("--difficulty", choices=["easy", "medium", "hard"], default="hard")
+    bench.set_defaults(handler=_run_bench)
+
+    bank = commands.add_parser("bank", help="Generate a question bank from JSONL documents")
+    bank.add_argument("--input", required=True, help="JSONL file with one document per line")
+    bank.add_argument("--output", required=True, help="JSONL file to stream question sets to")
+    bank.add_argument("--text-field", default="text")
+    bank.add_argument("--type", choices=["mixed", "mcq", "truefalse", "fillblank"], default="mixed")
+    bank.add_argument("--difficulty", choices=["easy", "medium", "hard"], default="medium")
+    bank.add_argument("--questions", type=int, default=10)
+    bank.add_argument("--n-process", type=int, default=1, help="spaCy parser processes")
+    bank.add_argument("--batch-size", type=int, default=32)
+    bank.add_argument("--workers", type=int, help="Question generation processes (defaults to CPU count)")
+    bank.set_defaults(handler=_run_bank)
+
+    grade = commands.add_parser("grade", help="Grade a class's answers to one quiz")
+    grade.add_argument("--quiz", required=True, help="Quiz JSON as produced by generate_quiz")
+    grade.add_argument("--answers", required=True,
+                       help='JSON {"student_ids": [...], "answers": {question_id: [answer per student]}}')
+    grade.add_argument("--fuzzy-threshold", type=float, default=0.85)
+    grade.set_defaults(handler=_run_grade)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
 
+if __name__ == "__main__":
+    main()
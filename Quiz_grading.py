@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+import numpy as np
+
+FUZZY_TYPES = ('fillblank',)
+DEFAULT_FUZZY_THRESHOLD = 0.85
+ROMAN_NUMERAL = re.compile(r'm{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})')
+
+
+def normalize_answer(answer):
+    if answer is None:
+        return ""
+    text = unicodedata.normalize('NFKC', str(answer)).casefold()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'^(?:the|a|an)\s+', '', text.strip())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def exact_answer(answer):
+    return "" if answer is None else str(answer).lower().strip()
+
+
+def numeric_tokens(text):
+    return [token for token in text.split()
+            if any(ch.isdigit() for ch in token) or ROMAN_NUMERAL.fullmatch(token)]
+
+
+class AnswerTable:
+    def __init__(self, questions, fuzzy_threshold=DEFAULT_FUZZY_THRESHOLD, normalizer=normalize_answer):
+        self.questions = list(questions)
+        self.normalizer = normalizer
+        self.ids = [q['id'] for q in self.questions]
+        self.keys = [normalizer(q['correct_answer']) for q in self.questions]
+        self.fuzzy = np.array([q['type'] in FUZZY_TYPES for q in self.questions], dtype=bool)
+        self.fuzzy_threshold = fuzzy_threshold
+        self._normalized = {}
+        self._similar = {}
+
+    def normalize(self, answers):
+        normalized = self._normalized
+        result = []
+        for answer in answers:
+            value = normalized.get(answer)
+            if value is None:
+                value = normalized[answer] = self.normalizer(answer)
+            result.append(value)
+        return result
+
+    def accepts(self, column, answer):
+        pair = (column, answer)
+        accepted = self._similar.get(pair)
+        if accepted is None:
+            key = self.keys[column]
+            accepted = bool(answer) and bool(key) and numeric_tokens(answer) == numeric_tokens(key) and \
+                SequenceMatcher(None, answer, key).ratio() >= self.fuzzy_threshold
+            self._similar[pair] = accepted
+        return accepted
+
+
+def answer_matrix(questions, answers):
+    if isinstance(answers, dict):
+        columns = [np.asarray(answers.get(q['id'], ()), dtype=object) for q in questions]
+        rows = max((len(column) for column in columns), default=0)
+        matrix = np.full((rows, len(questions)), "", dtype=object)
+        for j, column in enumerate(columns):
+            matrix[:len(column), j] = column
+        return matrix
+    matrix = np.array(answers, dtype=object)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+
+def grade_batch(quiz, answers, student_ids=None, table=None, fuzzy_threshold=DEFAULT_FUZZY_THRESHOLD,
+                normalizer=normalize_answer):
+    questions = quiz['questions']
+    table = table or AnswerTable(questions, fuzzy_threshold, normalizer)
+    matrix = answer_matrix(questions, answers)
+    students, n_questions = matrix.shape
+
+    matrix[np.equal(matrix, None)] = ""
+    uniques, inverse = np.unique(matrix.astype(str), return_inverse=True)
+    normalized, norm_inverse = np.unique(np.array(table.normalize(uniques.tolist()), dtype=object).astype(str),
+                                         return_inverse=True)
+    codes = norm_inverse[inverse].reshape(students, n_questions)
+
+    lookup = {value: i for i, value in enumerate(normalized.tolist())}
+    key_codes = np.array([lookup.get(key, -1) for key in table.keys], dtype=np.int64)
+    blank_code = lookup.get("", -1)
+    answered = codes != blank_code
+    correct = codes == key_codes
+
+    fuzzy_cells = ~correct & answered & table.fuzzy
+    fuzzy_matches = np.zeros_like(correct)
+    if table.fuzzy_threshold is not None and fuzzy_cells.any():
+        rows, cols = np.nonzero(fuzzy_cells)
+        pairs, pair_inverse = np.unique(np.stack([cols, codes[rows, cols]], axis=1), axis=0, return_inverse=True)
+        accepted = np.array([table.accepts(int(col), normalized[code]) for col, code in pairs], dtype=bool)
+        fuzzy_matches[rows, cols] = accepted[pair_inverse.reshape(-1)]
+        correct |= fuzzy_matches
+
+    scores = correct.sum(axis=1)
+    percentages = scores / n_questions * 100 if n_questions else np.zeros(students)
+    question_accuracy = correct.mean(axis=0) if students else np.zeros(n_questions)
+
+    per_question = []
+    for j, question in enumerate(questions):
+        wrong = codes[~correct[:, j] & answered[:, j], j]
+        common_wrong = None
+        if wrong.size:
+            values, counts = np.unique(wrong, return_counts=True)
+            common_wrong = normalized[values[counts.argmax()]]
+        per_question.append({
+            'id': question['id'],
+            'type': question['type'],
+            'topic': question['topic'],
+            'correct': int(correct[:, j].sum()),
+            'answered': int(answered[:, j].sum()),
+            'fuzzy_matches': int(fuzzy_matches[:, j].sum()),
+            'accuracy': float(question_accuracy[j]),
+            'common_wrong_answer': common_wrong
+        })
+
+    topics = np.array([q['topic'] for q in questions], dtype=object)
+    per_topic = {}
+    for topic in dict.fromkeys(topics.tolist()):
+        columns = topics == topic
+        attempts = students * int(columns.sum())
+        hits = int(correct[:, columns].sum())
+        per_topic[topic] = {
+            'questions': int(columns.sum()),
+            'attempts': attempts,
+            'correct': hits,
+            'accuracy': hits / attempts if attempts else 0.0
+        }
+
+    if student_ids is None:
+        student_ids = list(range(students))
+    return {
+        'student_ids': list(student_ids),
+        'correct': correct,
+        'scores': scores,
+        'percentages': percentages,
+        'per_question': per_question,
+        'per_topic': per_topic,
+        'summary': {
+            'students': students,
+            'questions': n_questions,
+            'mean_percentage': float(percentages.mean()) if students else 0.0,
+            'median_percentage': float(np.median(percentages)) if students else 0.0,
+            'std_percentage': float(percentages.std()) if students else 0.0
+        }
+    }
@@ -0,0 +1,128 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QuizJob:
+    def __init__(self, job_id, method, args, kwargs):
+        self.id = job_id
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self):
+        if self.status == DONE:
+            return 1.0
+        return self.done / self.total if self.total else 0.0
+
+    def report(self, done, total):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.done, self.total = done, total
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+
+
+class QuizJobRunner:
+    def __init__(self, max_workers=2, generator_factory=None, keep_finished=64):
+        if generator_factory is None:
+            from Quiz_generator import QuizGenerator
+            generator_factory = QuizGenerator
+        self.generator_factory = generator_factory
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quiz-job")
+        self._local = threading.local()
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _generator(self):
+        generator = getattr(self._local, 'generator', None)
+        if generator is None:
+            generator = self._local.generator = self.generator_factory()
+        return generator
+
+    def _run(self, job):
+        if job._cancel.is_set():
+            job.status = CANCELLED
+            job.finished = time.time()
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            method = getattr(self._generator(), job.method)
+            job.result = method(*job.args, on_progress=job.report, **job.kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+
+    def submit(self, method, *args, **kwargs):
+        with self._lock:
+            job = QuizJob(f"quiz-{next(self._ids)}", method, args, kwargs)
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.status not in FINISHED_STATES:
+                job.cancel()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,123 @@
+import random
+import re
+import zlib
+
+import numpy as np
+
+SIGNATURE_CHUNK = 4096
+
+
+def weighted_order(items, weights, rng=random):
+    keys = [rng.random() ** (1.0 / w) if w > 0 else -rng.random() for w in weights]
+    return [items[i] for i in sorted(range(len(items)), key=keys.__getitem__)]
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, shingle_size=3, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        state = np.random.RandomState(seed)
+        self.a = state.randint(0, 2 ** 63, size=(num_perm, 1), dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self.b = state.randint(0, 2 ** 63, size=(num_perm, 1), dtype=np.int64).astype(np.uint64)
+        self.mix = state.randint(0, 2 ** 63, size=shingle_size, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self._vocab = {}
+
+    def word_ids(self, text):
+        vocab = self._vocab
+        ids = []
+        for word in re.findall(r'\w+', text.lower()):
+            word_id = vocab.get(word)
+            if word_id is None:
+                word_id = vocab[word] = zlib.crc32(word.encode('utf-8')) + 1
+            ids.append(word_id)
+        if len(ids) < self.shingle_size:
+            ids.extend([0] * (self.shingle_size - len(ids)))
+        return ids
+
+    def _shingles(self, chunk):
+        size = self.shingle_size
+        lengths = np.array([len(ids) for ids in chunk], dtype=np.int64)
+        flat = np.fromiter((i for ids in chunk for i in ids), dtype=np.uint64, count=int(lengths.sum()))
+        counts = lengths - size + 1
+        offsets = np.cumsum(counts) - counts
+        starts = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        shingles = np.zeros(len(positions), dtype=np.uint64)
+        for j in range(size):
+            shingles += flat[positions + j] * self.mix[j]
+        return shingles, offsets
+
+    def signatures(self, texts):
+        texts = list(texts)
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        shift = np.uint64(32)
+        for start in range(0, len(texts), SIGNATURE_CHUNK):
+            chunk = [self.word_ids(text) for text in texts[start:start + SIGNATURE_CHUNK]]
+            shingles, offsets = self._shingles(chunk)
+            values = ((shingles * self.a + self.b) >> shift).astype(np.uint32)
+            result[start:start + len(chunk)] = np.minimum.reduceat(values, offsets, axis=1).T
+        return result
+
+
+class NearDuplicateIndex:
+    def __init__(self, num_perm=64, bands=8, threshold=0.8, seed=2):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        state = np.random.RandomState(seed)
+        self._mix = state.randint(0, 2 ** 63, size=self.rows, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self._buckets = [{} for _ in range(bands)]
+
+    def band_keys(self, signatures):
+        signatures = np.atleast_2d(signatures)
+        banded = signatures.reshape(len(signatures), self.bands, self.rows)
+        return (banded * self._mix).sum(axis=2, dtype=np.uint64)
+
+    def find(self, signature, keys=None):
+        if keys is None:
+            keys = self.band_keys(signature)[0].tolist()
+        for bucket, key in zip(self._buckets, keys):
+            other = bucket.get(key)
+            if other is not None and np.count_nonzero(other == signature) >= self.threshold * len(signature):
+                return other
+        return None
+
+    def add(self, signature, keys=None):
+        if keys is None:
+            keys = self.band_keys(signature)[0].tolist()
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, signature)
+
+
+class SentenceSelector:
+    def __init__(self, sentences, hasher=None, index=None, rng=random, weights=None):
+        self.sentences = list(sentences)
+        self.hasher = hasher or MinHasher()
+        self.index = index or NearDuplicateIndex(num_perm=self.hasher.num_perm)
+        self.rng = rng
+        self.rejected = 0
+        self._signatures = self.hasher.signatures(getattr(s, 'text', s) for s in self.sentences)
+        self._keys = self.index.band_keys(self._signatures).tolist() if self.sentences else []
+        self._pool = list(range(len(self.sentences)))
+        self._ordered = weights is not None
+        if self._ordered:
+            self._pool = weighted_order(self._pool, weights, rng)
+
+    def __len__(self):
+        return len(self._pool)
+
+    def pop(self):
+        while self._pool:
+            if not self._ordered:
+                k = self.rng.randrange(len(self._pool))
+                self._pool[k], self._pool[-1] = self._pool[-1], self._pool[k]
+            i = self._pool.pop()
+            signature, keys = self._signatures[i], self._keys[i]
+            if self.index.find(signature, keys) is not None:
+                self.rejected += 1
+                continue
+            self.index.add(signature, keys)
+            return self.sentences[i]
+        return None
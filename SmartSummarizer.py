@@ -1,50 +1,508 @@
-from transformers import BartForConditionalGeneration, BartTokenizer
-import spacy
+from transformers import BartConfig, BartForConditionalGeneration, BartTokenizer, TextIteratorStreamer
 from collections import Counter
 from graphviz import Digraph
+from itertools import islice
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
 import torch
+from Summary_cache import SummaryCache, checkpoint_fingerprint
+from Nlp_service import NlpService, get_nlp_service
+
+BASE_MODEL_NAME = "facebook/bart-base"
+DEFAULT_MODEL_PATH = "./fine_tuned_bart_model/fine_tuned_bart_model.pkl"
+DEFAULT_MODEL_DIR = "./fine_tuned_bart_model/bart_safetensors"
+DEFAULT_ONNX_DIR = "./fine_tuned_bart_model/onnx"
+
+BACKENDS = ('torch', 'int8', 'onnx')
+
+SUMMARY_LEVELS = {
+    'ultra_short': (50, 20),
+    'bullet_points': (200, 80),
+    'detailed': (300, 100)
+}
+
+SUMMARY_OUTPUTS = ('ultra_short', 'bullet_points', 'detailed',
+                   'key_terms', 'mind_map', 'flowchart')
+
+DECODING_PROFILES = {
+    'greedy': {'num_beams': 1, 'do_sample': False},
+    'beam2': {'num_beams': 2, 'length_penalty': 2.0, 'early_stopping': True},
+    'beam4': {'num_beams': 4, 'length_penalty': 2.0, 'early_stopping': True},
+    'sampling': {'num_beams': 1, 'do_sample': True, 'top_k': 50, 'top_p': 0.9}
+}
+
+PROFILE_QUALITY_ORDER = ('beam4', 'beam2', 'greedy')
+
+STREAMING_PROFILE = 'greedy'
+
+
+def can_stream(profile):
+    return DECODING_PROFILES[profile]['num_beams'] == 1
+
+LEVEL_PROFILES = {
+    'ultra_short': 'greedy',
+    'bullet_points': 'beam2',
+    'detailed': 'beam4'
+}
+
+CALIBRATION_TEXT = (
+    "Photosynthesis is the process by which green plants use sunlight, water and carbon "
+    "dioxide to produce glucose and oxygen. It takes place mainly in the chloroplasts of "
+    "leaf cells, where chlorophyll absorbs light energy. The light-dependent reactions "
+    "produce ATP and NADPH, which the Calvin cycle then uses to fix carbon into sugars."
+)
+
+MAX_INPUT_TOKENS = 1024
+WINDOW_TOKENS = 900
+WINDOW_OVERLAP_SENTENCES = 2
+PARTIAL_SUMMARY_LENGTH = (150, 40)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._footprints = {}
+        self._load_seconds = {}
+        self._cost_models = {}
+
+    def get_model(self, model_path=None, backend='torch'):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        model_path = resolve_model_path(model_path)
+        key = (model_path, backend)
+        with self._lock:
+            if key not in self._models:
+                started = time.perf_counter()
+                if backend == 'onnx':
+                    tokenizer, model = self._load_onnx_model(model_path)
+                    footprint = _directory_size(onnx_dir_for(model_path))
+                else:
+                    tokenizer, model = self._load_model(model_path)
+                    if backend == 'int8':
+                        model = torch.quantization.quantize_dynamic(
+                            model, {torch.nn.Linear}, dtype=torch.qint8)
+                    footprint = _state_dict_size(model)
+                self._models[key] = (tokenizer, model)
+                self._footprints[key] = footprint
+                self._load_seconds[key] = time.perf_counter() - started
+            return self._models[key]
+
+    def get_cost_model(self, model_path=None, backend='torch'):
+        key = (resolve_model_path(model_path), backend)
+        with self._lock:
+            if key not in self._cost_models:
+                self._cost_models[key] = DecodeCostModel()
+            return self._cost_models[key]
+
+    def get_nlp(self):
+        return get_nlp_service().nlp
+
+    def _load_model(self, model_path):
+        if is_model_dir(model_path):
+            tokenizer = BartTokenizer.from_pretrained(model_path, local_files_only=True)
+            model = BartForConditionalGeneration.from_pretrained(
+                model_path, local_files_only=True, use_safetensors=True)
+        else:
+            tokenizer, model = load_legacy_checkpoint(model_path)
+        model.eval()
+        for param in model.parameters():
+            param.requires_grad_(False)
+        return tokenizer, model
+
+    def _load_onnx_model(self, model_path):
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise ImportError("The onnx backend requires 'optimum[onnxruntime]'") from e
+        onnx_dir = onnx_dir_for(model_path)
+        if not os.path.isdir(onnx_dir):
+            raise FileNotFoundError(
+                f"No ONNX export found at {onnx_dir}; run 'python SmartSummarizer.py export-onnx' first")
+        tokenizer = BartTokenizer.from_pretrained(onnx_dir)
+        model = ORTModelForSeq2SeqLM.from_pretrained(onnx_dir, use_cache=True)
+        return tokenizer, model
+
+    def memory_usage(self):
+        with self._lock:
+            footprints = dict(self._footprints)
+            load_seconds = dict(self._load_seconds)
+        usage = {f"{model_path} [{backend}]": size
+                 for (model_path, backend), size in footprints.items()}
+        return {
+            "models": usage,
+            "load_seconds": {f"{model_path} [{backend}]": seconds
+                             for (model_path, backend), seconds in load_seconds.items()},
+            "total_bytes": sum(usage.values()),
+            "total_mb": sum(usage.values()) / (1024 * 1024)
+        }
+
+
+class DecodeCostModel:
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self.seconds_per_token = {}
+        self._lock = threading.Lock()
+
+    def record(self, profile, seconds, tokens):
+        if tokens <= 0:
+            return
+        observed = seconds / tokens
+        with self._lock:
+            previous = self.seconds_per_token.get(profile)
+            if previous is None:
+                self.seconds_per_token[profile] = observed
+            else:
+                self.seconds_per_token[profile] = previous + self.smoothing * (observed - previous)
+
+    def estimate(self, profile, max_length):
+        with self._lock:
+            rate = self.seconds_per_token.get(profile)
+        return None if rate is None else rate * max_length
+
+    def missing(self, profiles):
+        with self._lock:
+            return [profile for profile in profiles if profile not in self.seconds_per_token]
+
+
+_registry = ModelRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+def is_model_dir(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "config.json"))
+
+
+def resolve_model_path(model_path=None):
+    if model_path:
+        return model_path
+    return DEFAULT_MODEL_DIR if is_model_dir(DEFAULT_MODEL_DIR) else DEFAULT_MODEL_PATH
+
+
+def load_legacy_checkpoint(pkl_path):
+    tokenizer = BartTokenizer.from_pretrained(BASE_MODEL_NAME)
+    config = BartConfig.from_pretrained(BASE_MODEL_NAME)
+    state_dict = torch.load(pkl_path, map_location="cpu")
+    model = BartForConditionalGeneration.from_pretrained(None, config=config, state_dict=state_dict)
+    return tokenizer, model
+
+
+def convert_checkpoint(pkl_path=DEFAULT_MODEL_PATH, output_dir=DEFAULT_MODEL_DIR):
+    tokenizer, model = load_legacy_checkpoint(pkl_path)
+    model.save_pretrained(output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def measure_cold_start(model_path=None, backend='torch'):
+    registry = ModelRegistry()
+    started = time.perf_counter()
+    registry.get_model(model_path, backend)
+    model_seconds = time.perf_counter() - started
+    NlpService().nlp
+    return {
+        "model_path": resolve_model_path(model_path),
+        "backend": backend,
+        "model_seconds": model_seconds,
+        "total_seconds": time.perf_counter() - started
+    }
+
+
+def onnx_dir_for(model_path):
+    return os.path.join(os.path.dirname(os.path.normpath(model_path)), "onnx")
+
+
+def _state_dict_size(model):
+    total = 0
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, tuple) else (value,)
+        for tensor in tensors:
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
 class MultiLevelSummarizer:
-    def __init__(self, model_path="./fine_tuned_bart_model/fine_tuned_bart_model.pkl"):
-        self.model_path = model_path
-        self.tokenizer = BartTokenizer.from_pretrained("facebook/bart-base")
-        self.model = BartForConditionalGeneration.from_pretrained("facebook/bart-base")
-        state_dict = torch.load(self.model_path, map_location="cpu")
-        self.model.load_state_dict(state_dict)
-        self.model.eval()
-        self.nlp = spacy.load("en_core_web_sm")
-
-    def generate_summary(self, text, max_length, min_length):
-        inputs = self.tokenizer(text, max_length=1024, truncation=True,
+    def __init__(self, model_path=None, registry=None, cache=None, backend='torch'):
+        self.model_path = resolve_model_path(model_path)
+        self.backend = backend
+        self.registry = registry or get_registry()
+        self.tokenizer, self.model = self.registry.get_model(self.model_path, backend)
+        self.nlp_service = get_nlp_service()
+        self.nlp = self.nlp_service.nlp
+        self.cache = cache
+        self.checkpoint = f"{checkpoint_fingerprint(self.model_path)}:{backend}"
+        self.cost_model = self.registry.get_cost_model(self.model_path, backend)
+
+    def generate_summary(self, text, max_length, min_length, profile='beam4'):
+        key = None
+        if self.cache:
+            key = self._summary_key(text, max_length, min_length, profile)
+            cached = self.cache.get_json(key)
+            if cached is not None:
+                return cached
+
+        inputs = self.tokenizer(text, max_length=MAX_INPUT_TOKENS, truncation=True,
                                 return_tensors="pt")
+        summary_ids = self._generate(inputs, max_length, min_length, profile)
+        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        if key:
+            self.cache.put_json(key, 'summary', summary)
+        return summary
+
+    def _summary_key(self, text, max_length, min_length, profile):
+        return self.cache.make_key('summary', text, self.checkpoint,
+                                   max_length=max_length, min_length=min_length,
+                                   **DECODING_PROFILES[profile])
+
+    def _generate(self, inputs, max_length, min_length, profile='beam4', streamer=None):
+        started = time.perf_counter()
         summary_ids = self.model.generate(
             inputs["input_ids"],
+            attention_mask=inputs.get("attention_mask"),
             max_length=max_length,
             min_length=min_length,
-            length_penalty=2.0,
-            num_beams=4,
-            early_stopping=True
+            streamer=streamer,
+            **DECODING_PROFILES[profile]
         )
-        return self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        if summary_ids.shape[0] == 1:
+            self.cost_model.record(profile, time.perf_counter() - started, summary_ids.shape[1])
+        return summary_ids
+
+    def stream_summary(self, text, level='detailed', profile=None, on_partial=None):
+        max_length, min_length = SUMMARY_LEVELS[level]
+        profile = profile or LEVEL_PROFILES[level]
+        if not can_stream(profile):
+            profile = STREAMING_PROFILE
+
+        source = self.condense(text, on_partial=on_partial)
+        key = None
+        if self.cache:
+            key = self._summary_key(source, max_length, min_length, profile)
+            cached = self.cache.get_json(key)
+            if cached is not None:
+                yield cached
+                return
+
+        inputs = self.tokenizer(source, max_length=MAX_INPUT_TOKENS, truncation=True,
+                                return_tensors="pt")
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def run():
+            try:
+                self._generate(inputs, max_length, min_length, profile, streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        pieces = []
+        for piece in streamer:
+            pieces.append(piece)
+            yield piece
+        worker.join()
+        if errors:
+            raise errors[0]
+
+        if key:
+            self.cache.put_json(key, 'summary', ''.join(pieces).strip())
+
+    def choose_profile(self, max_length, latency_budget, preferred='beam4'):
+        if preferred not in PROFILE_QUALITY_ORDER:
+            return preferred
+        candidates = PROFILE_QUALITY_ORDER[PROFILE_QUALITY_ORDER.index(preferred):]
+        self.calibrate(candidates)
+        for profile in candidates:
+            estimate = self.cost_model.estimate(profile, max_length)
+            if estimate is not None and estimate <= latency_budget:
+                return profile
+        return candidates[-1]
+
+    def calibrate(self, profiles=tuple(DECODING_PROFILES), max_length=32):
+        inputs = None
+        for profile in self.cost_model.missing(profiles):
+            if inputs is None:
+                inputs = self.tokenizer(CALIBRATION_TEXT, return_tensors="pt")
+            self._generate(inputs, max_length, min(8, max_length), profile)
+
+    def summarize_batch(self, texts, level='detailed', batch_size=8, profile=None):
+        max_length, min_length = SUMMARY_LEVELS[level]
+        profile = profile or LEVEL_PROFILES[level]
+        summaries = self._generate_batch(list(texts), max_length, min_length, batch_size, profile)
+        return [self.finish_level(level, summary) for summary in summaries]
+
+    def _generate_batch(self, texts, max_length, min_length, batch_size, profile='beam4'):
+        summaries = [None] * len(texts)
+        keys = [None] * len(texts)
+        if self.cache:
+            for i, text in enumerate(texts):
+                keys[i] = self._summary_key(text, max_length, min_length, profile)
+                summaries[i] = self.cache.get_json(keys[i])
+
+        pending = [i for i in range(len(texts)) if summaries[i] is None]
+        if not pending:
+            return summaries
+        encoded = self.tokenizer([texts[i] for i in pending], max_length=MAX_INPUT_TOKENS,
+                                 truncation=True)["input_ids"]
+        encoded = dict(zip(pending, encoded))
+        order = sorted(pending, key=lambda i: len(encoded[i]))
+
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            inputs = self.tokenizer.pad({"input_ids": [encoded[i] for i in bucket]},
+                                        return_tensors="pt")
+            summary_ids = self._generate(inputs, max_length, min_length, profile)
+            decoded = self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+            for i, summary in zip(bucket, decoded):
+                summaries[i] = summary
+                if keys[i]:
+                    self.cache.put_json(keys[i], 'summary', summary)
+
+        return summaries
+
+    def count_tokens(self, text):
+        return len(self.tokenizer(text, truncation=False)["input_ids"])
+
+    def is_long(self, text):
+        return self.count_tokens(text) > MAX_INPUT_TOKENS
+
+    def iter_long_summary(self, text, level='detailed', window_tokens=WINDOW_TOKENS,
+                          overlap_sentences=WINDOW_OVERLAP_SENTENCES, batch_size=4):
+        condensed = text
+        for kind, value in self._condense_steps(text, window_tokens, overlap_sentences, batch_size):
+            if kind == 'partial':
+                yield 'partial', value
+            else:
+                condensed = value
+        yield 'final', self.finish_level(level, self.generate_level(condensed, level))
+
+    def condense(self, text, window_tokens=WINDOW_TOKENS,
+                 overlap_sentences=WINDOW_OVERLAP_SENTENCES, batch_size=4, on_partial=None):
+        condensed = text
+        for kind, value in self._condense_steps(text, window_tokens, overlap_sentences, batch_size):
+            if kind == 'partial':
+                if on_partial:
+                    on_partial(value)
+            else:
+                condensed = value
+        return condensed
+
+    def _condense_steps(self, text, window_tokens, overlap_sentences, batch_size):
+        if not self.is_long(text):
+            yield 'condensed', text
+            return
+
+        reduced = []
+        windows = self._iter_windows(text, window_tokens, overlap_sentences)
+        while True:
+            batch = list(islice(windows, batch_size))
+            if not batch:
+                break
+            for partial in self._generate_batch(batch, *PARTIAL_SUMMARY_LENGTH, batch_size):
+                yield 'partial', partial
+                reduced.append(partial)
+                if self.count_tokens(' '.join(reduced)) > window_tokens:
+                    reduced = [self.generate_summary(' '.join(reduced), *PARTIAL_SUMMARY_LENGTH)]
+
+        yield 'condensed', ' '.join(reduced)
+
+    def _iter_windows(self, text, window_tokens, overlap_sentences):
+        window = []
+        window_length = 0
+        for sentence in self._iter_sentences(text):
+            length = len(self.tokenizer.tokenize(sentence))
+            if window and window_length + length > window_tokens:
+                yield ' '.join(s for s, _ in window)
+                window = window[-overlap_sentences:] if overlap_sentences else []
+                while window and sum(n for _, n in window) + length > window_tokens:
+                    window.pop(0)
+                window_length = sum(n for _, n in window)
+            window.append((sentence, length))
+            window_length += length
+
+        if window:
+            yield ' '.join(s for s, _ in window)
+
+    def _iter_sentences(self, text):
+        paragraphs = (match.group(0).strip()
+                      for match in re.finditer(r'(?:[^\n]|\n(?!\s*\n))+', text))
+        disabled = [name for name in ('ner', 'lemmatizer') if name in self.nlp.pipe_names]
+        for doc in self.nlp.pipe((p for p in paragraphs if p), disable=disabled):
+            for sent in doc.sents:
+                sentence = sent.text.strip()
+                if sentence:
+                    yield sentence
+
+    def generate_level(self, text, level, profile=None, latency_budget=None):
+        max_length, min_length = SUMMARY_LEVELS[level]
+        profile = self.level_profile(level, profile, latency_budget)
+        return self.generate_summary(text, max_length=max_length, min_length=min_length,
+                                     profile=profile)
+
+    def level_profile(self, level, profile=None, latency_budget=None):
+        profile = profile or LEVEL_PROFILES[level]
+        if latency_budget is not None:
+            profile = self.choose_profile(SUMMARY_LEVELS[level][0], latency_budget, preferred=profile)
+        return profile
 
     def ultra_short_summary(self, text):
-        summary = self.generate_summary(text, max_length=50, min_length=20)
+        return self._shorten(self.generate_level(text, 'ultra_short'))
+
+    def bullet_point_summary(self, text):
+        return self._split_bullets(self.generate_level(text, 'bullet_points'))
+
+    def detailed_summary(self, text):
+        return self.generate_level(text, 'detailed')
+
+    def finish_level(self, level, summary):
+        if level == 'ultra_short':
+            return self._shorten(summary)
+        if level == 'bullet_points':
+            return self._split_bullets(summary)
+        return summary
+
+    def _shorten(self, summary):
         if len(summary) > 280:
             summary = summary[:277] + "..."
 
         return summary
 
-    def bullet_point_summary(self, text):
-        summary = self.generate_summary(text, max_length=200, min_length=80)
-        doc = self.nlp(summary)
+    def _split_bullets(self, summary):
+        doc = self.nlp_service.parse(summary, disable=('ner', 'lemmatizer'))
         sentences = [sent.text.strip() for sent in doc.sents]
         bullet_points = sentences[:5] if len(sentences) > 5 else sentences
         return bullet_points
 
-    def detailed_summary(self, text):
-        return self.generate_summary(text, max_length=300, min_length=100)
-
     def extract_key_terms(self, text, top_n=10):
-        doc = self.nlp(text)
+        key = None
+        if self.cache:
+            key = self.cache.make_key('key_terms', text, top_n=top_n)
+            cached = self.cache.get_json(key)
+            if cached is not None:
+                return cached
+
+        key_terms = self._rank_key_terms(text, top_n)
+        if key:
+            self.cache.put_json(key, 'key_terms', key_terms)
+        return key_terms
+
+    def _rank_key_terms(self, text, top_n):
+        doc = self.nlp_service.parse(text, disable=('lemmatizer',))
 
         entities = [ent.text for ent in doc.ents
                    if ent.label_ in ['PERSON', 'ORG', 'GPE', 'EVENT', 'PRODUCT']]
@@ -58,12 +516,16 @@ class MultiLevelSummarizer:
 
         return key_terms
 
-    def create_mind_map(self, text, output_file="mindmap"):
-        main_summary = self.ultra_short_summary(text)
+    def create_mind_map(self, text, output_file="mindmap", main_summary=None,
+                        bullets=None, key_terms=None):
+        if main_summary is None:
+            main_summary = self.ultra_short_summary(text)
 
-        bullets = self.bullet_point_summary(text)
+        if bullets is None:
+            bullets = self.bullet_point_summary(text)
 
-        key_terms = self.extract_key_terms(text, top_n=6)
+        if key_terms is None:
+            key_terms = self.extract_key_terms(text, top_n=6)
 
         dot = Digraph(comment='Summary Mind Map')
         dot.attr(rankdir='LR', size='10,8')
@@ -86,11 +548,11 @@ class MultiLevelSummarizer:
             dot.node(term_id, term, fillcolor='lightgray', fontsize='10')
             dot.edge('terms', term_id)
 
-        dot.render(output_file, format='png', cleanup=True)
-        return f"{output_file}.png"
+        return self._render(dot, output_file)
 
-    def create_flowchart(self, text, output_file="flowchart"):
-        bullets = self.bullet_point_summary(text)
+    def create_flowchart(self, text, output_file="flowchart", bullets=None):
+        if bullets is None:
+            bullets = self.bullet_point_summary(text)
 
         dot = Digraph(comment='Summary Flowchart')
         dot.attr(rankdir='TB')
@@ -109,15 +571,332 @@ class MultiLevelSummarizer:
         dot.node('end', 'Conclusion', shape='ellipse', fillcolor='lightcoral')
         dot.edge(prev_node, 'end')
 
+        return self._render(dot, output_file)
+
+    def _render(self, dot, output_file):
+        image_path = f"{output_file}.png"
+        key = None
+        if self.cache:
+            key = self.cache.make_key('diagram', dot.source, format='png')
+            cached = self.cache.get(key)
+            if cached is not None:
+                with open(image_path, 'wb') as f:
+                    f.write(cached)
+                return image_path
+
         dot.render(output_file, format='png', cleanup=True)
-        return f"{output_file}.png"
+        if key:
+            with open(image_path, 'rb') as f:
+                self.cache.put(key, 'diagram', f.read())
+        return image_path
 
-    def summarize_all(self, text):
-        return {
-            'ultra_short': self.ultra_short_summary(text),
-            'bullet_points': self.bullet_point_summary(text),
-            'detailed': self.detailed_summary(text),
-            'key_terms': self.extract_key_terms(text),
-            'mind_map': self.create_mind_map(text),
-            'flowchart': self.create_flowchart(text)
+    def summarize_all(self, text, outputs=SUMMARY_OUTPUTS, on_partial=None, latency_budget=None,
+                      condensed=None):
+        unknown = set(outputs) - set(SUMMARY_OUTPUTS)
+        if unknown:
+            raise ValueError(f"Unknown summary outputs: {', '.join(sorted(unknown))}")
+
+        plan = SummaryPlan(self, text, on_partial=on_partial, outputs=outputs,
+                           latency_budget=latency_budget)
+        plan.source = condensed
+        return {name: plan.get(name) for name in SUMMARY_OUTPUTS if name in outputs}
+
+    def memory_usage(self):
+        return self.registry.memory_usage()
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else None
+
+
+OUTPUT_LEVELS = {
+    'ultra_short': ('ultra_short',),
+    'bullet_points': ('bullet_points',),
+    'detailed': ('detailed',),
+    'key_terms': (),
+    'mind_map': ('ultra_short', 'bullet_points'),
+    'flowchart': ('bullet_points',)
+}
+
+
+class SummaryPlan:
+    def __init__(self, summarizer, text, on_partial=None, outputs=SUMMARY_OUTPUTS,
+                 latency_budget=None):
+        self.summarizer = summarizer
+        self.text = text
+        self.on_partial = on_partial
+        self.source = None
+        self.generations = {}
+        self.profiles = {}
+        self.outputs = {}
+        self.pending_levels = {level for name in outputs for level in OUTPUT_LEVELS[name]}
+        self.deadline = None
+        if latency_budget is not None:
+            self.deadline = time.perf_counter() + latency_budget
+
+    def generation(self, level):
+        if self.source is None:
+            self.source = self.summarizer.condense(self.text, on_partial=self.on_partial)
+        if level not in self.profiles:
+            self.profiles[level] = self.summarizer.level_profile(level, latency_budget=self._budget_share())
+            self.pending_levels.discard(level)
+        max_length, min_length = SUMMARY_LEVELS[level]
+        profile = self.profiles[level]
+        key = (self.source, max_length, min_length, profile)
+        if key not in self.generations:
+            self.generations[key] = self.summarizer.generate_summary(
+                self.source, max_length=max_length, min_length=min_length, profile=profile)
+        return self.generations[key]
+
+    def _budget_share(self):
+        if self.deadline is None:
+            return None
+        remaining = max(0.0, self.deadline - time.perf_counter())
+        return remaining / max(1, len(self.pending_levels))
+
+    def get(self, name):
+        if name not in self.outputs:
+            self.outputs[name] = self._build(name)
+        return self.outputs[name]
+
+    def _build(self, name):
+        summarizer = self.summarizer
+        if name == 'ultra_short':
+            return summarizer._shorten(self.generation('ultra_short'))
+        if name == 'bullet_points':
+            return summarizer._split_bullets(self.generation('bullet_points'))
+        if name == 'detailed':
+            return self.generation('detailed')
+        if name == 'key_terms':
+            return summarizer.extract_key_terms(self.text)
+        if name == 'mind_map':
+            return summarizer.create_mind_map(
+                self.text,
+                main_summary=self.get('ultra_short'),
+                bullets=self.get('bullet_points'),
+                key_terms=self.get('key_terms')[:6]
+            )
+        if name == 'flowchart':
+            return summarizer.create_flowchart(self.text, bullets=self.get('bullet_points'))
+        raise ValueError(f"Unknown summary output: {name}")
+
+
+def summarize_jsonl(summarizer, lines, level='detailed', batch_size=8,
+                    chunk_size=256, text_field='text'):
+    records = (json.loads(line) for line in lines if line.strip())
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        summaries = summarizer.summarize_batch(
+            [record[text_field] for record in chunk], level=level, batch_size=batch_size)
+        for record, summary in zip(chunk, summaries):
+            record['summary'] = summary
+            yield record
+
+
+def export_onnx(model_path=None, output_dir=None):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError("Exporting to ONNX requires 'optimum[onnxruntime]'") from e
+    import tempfile
+
+    model_path = resolve_model_path(model_path)
+    output_dir = output_dir or onnx_dir_for(model_path)
+    tokenizer, model = get_registry().get_model(model_path, 'torch')
+    with tempfile.TemporaryDirectory() as staging:
+        model.save_pretrained(staging)
+        tokenizer.save_pretrained(staging)
+        ort_model = ORTModelForSeq2SeqLM.from_pretrained(staging, export=True, use_cache=True)
+        ort_model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def parity_check(records, backend, model_path=None, level='detailed',
+                 batch_size=8, text_field='text', reference_field='summary'):
+    from rouge_score import rouge_scorer
+
+    scorer = rouge_scorer.RougeScorer(['rouge1'], use_stemmer=True)
+    texts = [record[text_field] for record in records]
+    references = [record[reference_field] for record in records]
+    model_path = resolve_model_path(model_path)
+    registry = get_registry()
+    report = {}
+    for name in ('torch', backend):
+        summarizer = MultiLevelSummarizer(model_path=model_path, backend=name)
+        started = time.perf_counter()
+        summaries = summarizer.summarize_batch(texts, level=level, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        summaries = [' '.join(s) if isinstance(s, list) else s for s in summaries]
+        scores = [scorer.score(reference, summary)['rouge1'].fmeasure
+                  for reference, summary in zip(references, summaries)]
+        memory = registry.memory_usage()["models"][f"{model_path} [{name}]"]
+        report[name] = {
+            "rouge1": sum(scores) / len(scores) if scores else 0.0,
+            "seconds_per_doc": elapsed / len(texts) if texts else 0.0,
+            "model_mb": memory / (1024 * 1024)
         }
+    report["rouge1_diff"] = report[backend]["rouge1"] - report["torch"]["rouge1"]
+    return report
+
+
+def benchmark_decoding(summarizer, records, level='detailed', text_field='text',
+                       reference_field='summary', profiles=tuple(DECODING_PROFILES)):
+    from rouge_score import rouge_scorer
+
+    scorer = rouge_scorer.RougeScorer(['rouge1'], use_stemmer=True)
+    max_length, min_length = SUMMARY_LEVELS[level]
+    texts = [record[text_field] for record in records]
+    references = [record.get(reference_field) for record in records]
+    if not all(references):
+        references = [summarizer.generate_summary(text, max_length, min_length, profile='beam4')
+                      for text in texts]
+
+    rows = []
+    for profile in profiles:
+        latencies = []
+        scores = []
+        for text, reference in zip(texts, references):
+            started = time.perf_counter()
+            summary = summarizer.generate_summary(text, max_length, min_length, profile=profile)
+            latencies.append(time.perf_counter() - started)
+            scores.append(scorer.score(reference, summary)['rouge1'].fmeasure)
+        latencies.sort()
+        rows.append({
+            "profile": profile,
+            "mean_seconds": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p95_seconds": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            "seconds_per_token": summarizer.cost_model.seconds_per_token.get(profile, 0.0),
+            "rouge1": sum(scores) / len(scores) if scores else 0.0
+        })
+    return rows
+
+
+def _read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _run_convert(args):
+    output_dir = convert_checkpoint(args.model_path or DEFAULT_MODEL_PATH, args.output_dir)
+    print(f"Wrote safetensors model directory to {output_dir}", file=sys.stderr)
+
+
+def _run_cold_start(args):
+    report = measure_cold_start(args.model_path, args.backend)
+    print(f"Model {report['model_path']} [{report['backend']}] loaded in "
+          f"{report['model_seconds']:.2f}s ({report['total_seconds']:.2f}s including spaCy)")
+
+
+def _run_export_onnx(args):
+    output_dir = export_onnx(args.model_path, args.output_dir)
+    print(f"Exported ONNX model to {output_dir}", file=sys.stderr)
+
+
+def _run_parity(args):
+    records = _read_jsonl(args.data)
+    if args.limit:
+        records = records[:args.limit]
+    report = parity_check(records, args.backend, model_path=args.model_path, level=args.level,
+                          batch_size=args.batch_size, text_field=args.text_field,
+                          reference_field=args.reference_field)
+    print(f"{'backend':<8} {'ROUGE-1':>8} {'s/doc':>8} {'model MB':>9}")
+    for name in ('torch', args.backend):
+        row = report[name]
+        print(f"{name:<8} {row['rouge1']:>8.4f} {row['seconds_per_doc']:>8.3f} {row['model_mb']:>9.1f}")
+    print(f"ROUGE-1 difference vs fp32: {report['rouge1_diff']:+.4f}")
+
+
+def _run_bench_decoding(args):
+    records = _read_jsonl(args.data)[:args.limit]
+    summarizer = MultiLevelSummarizer(model_path=args.model_path, backend=args.backend)
+    rows = benchmark_decoding(summarizer, records, level=args.level, text_field=args.text_field,
+                              reference_field=args.reference_field)
+    print(f"{'profile':<9} {'mean s':>8} {'p95 s':>8} {'ms/token':>9} {'ROUGE-1':>8}")
+    for row in rows:
+        print(f"{row['profile']:<9} {row['mean_seconds']:>8.3f} {row['p95_seconds']:>8.3f} "
+              f"{row['seconds_per_token'] * 1000:>9.2f} {row['rouge1']:>8.4f}")
+
+
+def _run_batch(args):
+    cache = SummaryCache(args.cache) if args.cache else None
+    summarizer = MultiLevelSummarizer(model_path=args.model_path, cache=cache,
+                                      backend=args.backend)
+    source = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+    sink = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.perf_counter()
+    count = 0
+    try:
+        for record in summarize_jsonl(summarizer, source, level=args.level,
+                                      batch_size=args.batch_size,
+                                      chunk_size=args.chunk_size,
+                                      text_field=args.text_field):
+            sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+            sink.flush()
+            count += 1
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Summarized {count} documents in {elapsed:.1f}s ({rate:.2f} docs/sec)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StudyHub multi-level summarizer")
+    parser.add_argument("--model-path",
+                        help=f"Model directory or legacy .pkl (defaults to {DEFAULT_MODEL_DIR} "
+                             f"when converted, else {DEFAULT_MODEL_PATH})")
+    parser.add_argument("--cache", help="Summary cache database (disabled when omitted)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Summarize JSONL documents from stdin or a file")
+    batch.add_argument("--input", help="JSONL input file (defaults to stdin)")
+    batch.add_argument("--output", help="JSONL output file (defaults to stdout)")
+    batch.add_argument("--level", choices=sorted(SUMMARY_LEVELS), default="detailed")
+    batch.add_argument("--batch-size", type=int, default=8)
+    batch.add_argument("--chunk-size", type=int, default=256,
+                       help="Documents read ahead and sorted into length buckets")
+    batch.add_argument("--text-field", default="text")
+    batch.set_defaults(handler=_run_batch)
+
+    convert = commands.add_parser("convert", help="Convert the legacy .pkl checkpoint to a "
+                                                  "self-contained safetensors model directory")
+    convert.add_argument("--output-dir", default=DEFAULT_MODEL_DIR)
+    convert.set_defaults(handler=_run_convert)
+
+    cold_start = commands.add_parser("cold-start", help="Measure model load time in a fresh registry")
+    cold_start.set_defaults(handler=_run_cold_start)
+
+    export = commands.add_parser("export-onnx", help="Export the fine-tuned model to ONNX Runtime")
+    export.add_argument("--output-dir", help=f"Defaults to {DEFAULT_ONNX_DIR}")
+    export.set_defaults(handler=_run_export_onnx)
+
+    parity = commands.add_parser("parity", help="Compare a backend against fp32 on a held-out set")
+    parity.add_argument("--data", required=True, help="JSONL file with text and reference summaries")
+    parity.add_argument("--level", choices=sorted(SUMMARY_LEVELS), default="detailed")
+    parity.add_argument("--batch-size", type=int, default=8)
+    parity.add_argument("--limit", type=int)
+    parity.add_argument("--text-field", default="text")
+    parity.add_argument("--reference-field", default="summary")
+    parity.set_defaults(handler=_run_parity)
+
+    bench = commands.add_parser("bench-decoding", help="Compare decoding profiles for latency and ROUGE-1")
+    bench.add_argument("--data", required=True,
+                       help="JSONL file; references default to beam-4 output when missing")
+    bench.add_argument("--level", choices=sorted(SUMMARY_LEVELS), default="detailed")
+    bench.add_argument("--limit", type=int, default=20)
+    bench.add_argument("--text-field", default="text")
+    bench.add_argument("--reference-field", default="summary")
+    bench.set_defaults(handler=_run_bench_decoding)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import streamlit as st
+import atexit
 import time
 from datetime import datetime
 import json
+import os
 import Study_planner 
 st.set_page_config(
     page_title="StudyHub - Smart Learning Platform",
@@ -134,11 +136,51 @@ def get_spaced_repetition():
         st.session_state.spaced_repetition = FlashcardGenerator[1]()
     return st.session_state.spaced_repetition
 
+@st.cache_resource
+def load_parsed_docs():
+    from Nlp_service import get_nlp_service
+    service = get_nlp_service()
+    service.load()
+    atexit.register(service.save)
+    return service
+
+@st.cache_resource
+def get_question_bank():
+    from Question_bank import QuestionBank
+    return QuestionBank()
+
+@st.cache_resource
+def get_quiz_jobs():
+    from Quiz_jobs import QuizJobRunner
+    runner = QuizJobRunner(max_workers=int(os.environ.get("STUDYHUB_QUIZ_WORKERS", "2")))
+    atexit.register(runner.shutdown)
+    return runner
+
+@st.cache_resource
+def get_summary_cache():
+    from Summary_cache import SummaryCache
+    return SummaryCache()
+
+def get_session_user():
+    user = st.query_params.get("user", "").strip()
+    if not user:
+        import uuid
+        user = st.query_params["user"] = uuid.uuid4().hex[:12]
+    return user
+
+def get_session_weakness():
+    from Weakness_model import get_weakness_model
+    return get_weakness_model(get_session_user())
+
 def get_summarizer():
     if 'summarizer' not in st.session_state:
         SmartSummarizer = lazy_import_module('SmartSummarizer')
         if SmartSummarizer:
-            st.session_state.summarizer = SmartSummarizer.MultiLevelSummarizer()
+            load_parsed_docs()
+            st.session_state.summarizer = SmartSummarizer.MultiLevelSummarizer(
+                cache=get_summary_cache(),
+                backend=os.environ.get("STUDYHUB_SUMMARIZER_BACKEND", "torch")
+            )
         else:
             st.session_state.summarizer = None
     return st.session_state.summarizer
@@ -159,6 +201,11 @@ page = st.sidebar.radio(
     label_visibility="collapsed"
 )
 
+profile_name = st.sidebar.text_input("👤 Profile", value=get_session_user(),
+                                     help="Quiz progress is saved under this name. Bookmark the page to keep it.")
+if profile_name.strip() and profile_name.strip() != get_session_user():
+    st.query_params["user"] = profile_name.strip()
+
 st.sidebar.markdown("<hr style='border: 1px solid rgba(0, 217, 255, 0.15); margin: 20px 0;'>", unsafe_allow_html=True)
 
 st.sidebar.markdown("### 📊 Quick Stats")
@@ -294,38 +341,103 @@ elif page == "📝 Smart Summarizer":
             "Summary Type", 
             ["Bullet Points", "Paragraph", "Key Concepts"]
         )
+        latency_budget = st.slider("Latency Budget (seconds)", min_value=0, max_value=60, value=0,
+                                   help="0 means no limit; otherwise faster decoding is used when needed")
+        stream_preview = st.checkbox("Preview While Generating",
+                                     help="Stream a fast draft of paragraph summaries that use beam search; "
+                                          "costs an extra generation")
         create_mindmap = st.checkbox("Create MindMap")
         create_flowchart = st.checkbox("Create FlowChart")
+        if summarizer:
+            model_memory = summarizer.memory_usage()
+            load_seconds = sum(model_memory['load_seconds'].values())
+            st.caption(f"Shared model memory: {model_memory['total_mb']:.0f} MB "
+                       f"(loaded in {load_seconds:.1f}s)")
+            cache_stats = summarizer.cache_stats()
+            if cache_stats:
+                st.caption(f"Summary cache: {cache_stats['entries']} entries, "
+                           f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
         
         if st.button(" Generate Summary", use_container_width=True):
             if input_text:
                 with st.spinner("--> Analyzing and generating summary..."):
                     try:
                         summarizer = st.session_state.summarizer
-                        results = summarizer.summarize_all(input_text)
-                        
-                        if summary_length == 'Brief':
-                            text = results['ultra_short']
-                        else:
-                            text = results['detailed']
-        
+                        outputs = {'key_terms'}
+                        level = 'ultra_short' if summary_length == 'Brief' else 'detailed'
                         if summary_type == 'Bullet Points':
-                            text = results['bullet_points']
-                        elif summary_type == 'Key Concepts':
-                            text = results['key_terms']
-                        
-                        st.success(" Summary generated successfully!")
-                     
+                            outputs.add('bullet_points')
+                        elif summary_type == 'Paragraph':
+                            outputs.add(level)
+                        if create_mindmap:
+                            outputs.add('mind_map')
+                        if create_flowchart:
+                            outputs.add('flowchart')
+                        SmartSummarizer = lazy_import_module('SmartSummarizer')
+                        condensed = None
+                        if any(SmartSummarizer.OUTPUT_LEVELS[name] for name in outputs):
+                            partial_box = st.empty()
+                            partials = []
+
+                            def show_partial(partial):
+                                partials.append(partial)
+                                partial_box.markdown(
+                                    f"**Long text: condensed section {len(partials)}**\n\n{partial}"
+                                )
+
+                            condensed = summarizer.condense(input_text, on_partial=show_partial)
+                            partial_box.empty()
+
                         st.markdown("###  Generated Summary")
-                        if isinstance(text, list):
-                            for item in text:
-                                st.markdown(f"• {item}")
-                        else:
-                            st.markdown(f"""
+                        started = time.perf_counter()
+                        first_token_seconds = None
+                        summary_text = None
+                        if summary_type == 'Paragraph':
+                            summary_box = st.empty()
+                            profile = summarizer.level_profile(level, latency_budget=latency_budget or None)
+                            streams_final = SmartSummarizer.can_stream(profile)
+                            if streams_final or stream_preview:
+                                label = "" if streams_final else "<em>Preview:</em> "
+                                streamed = ""
+                                for piece in summarizer.stream_summary(condensed, level=level, profile=profile):
+                                    if first_token_seconds is None:
+                                        first_token_seconds = time.perf_counter() - started
+                                    streamed += piece
+                                    summary_box.markdown(f"""
+                                    <div class='feature-card' style='border-color: rgba(16, 185, 129, 0.3) !important;'>
+                                        <p style='color: #a0a0a0; line-height: 1.8;'>{label}{streamed}▌</p>
+                                    </div>
+                                    """, unsafe_allow_html=True)
+                                if streams_final:
+                                    summary_text = summarizer.finish_level(level, streamed.strip())
+                                    outputs.discard(level)
+
+                        remaining_budget = None
+                        if latency_budget:
+                            remaining_budget = max(0.0, latency_budget - (time.perf_counter() - started))
+                        results = summarizer.summarize_all(input_text, outputs=outputs,
+                                                           latency_budget=remaining_budget,
+                                                           condensed=condensed)
+
+                        if summary_type == 'Paragraph':
+                            if summary_text is None:
+                                summary_text = results[level]
+                            summary_box.markdown(f"""
                             <div class='feature-card' style='border-color: rgba(16, 185, 129, 0.3) !important;'>
-                                <p style='color: #e0e0e0; line-height: 1.8;'>{text}</p>
+                                <p style='color: #e0e0e0; line-height: 1.8;'>{summary_text}</p>
                             </div>
                             """, unsafe_allow_html=True)
+                            if first_token_seconds is not None:
+                                st.caption(f"First words after {first_token_seconds:.1f}s, "
+                                           f"complete after {time.perf_counter() - started:.1f}s")
+                        elif summary_type == 'Bullet Points':
+                            for item in results['bullet_points']:
+                                st.markdown(f"• {item}")
+                        elif summary_type == 'Key Concepts':
+                            for item in results['key_terms']:
+                                st.markdown(f"• {item}")
+
+                        st.success(" Summary generated successfully!")
                         
                         if create_mindmap:
                             st.markdown("### 🧠 Mind Map")
@@ -359,7 +471,9 @@ elif page == "❓ Quiz Generator":
     st.markdown("<p style='text-align: center; color: #666;'>Generate custom quizzes from your study material</p>", unsafe_allow_html=True)
     Quiz_generator = lazy_import_module('Quiz_generator')
     if 'quiz_generator' not in st.session_state:
-        st.session_state.quiz_generator = Quiz_generator.QuizGenerator()
+        load_parsed_docs()
+        st.session_state.quiz_generator = Quiz_generator.QuizGenerator(weakness=get_session_weakness())
+    st.session_state.quiz_generator.weakness = get_session_weakness()
     if 'generated_quiz' not in st.session_state:
         st.session_state.generated_quiz = None
     if 'current_question' not in st.session_state:
@@ -396,40 +510,57 @@ elif page == "❓ Quiz Generator":
                                   value=False,
                                   help="Generate questions on topics you've struggled with previously")
         
-        if st.button("🎯 Generate Quiz", use_container_width=True):
+        quiz_jobs = get_quiz_jobs()
+        job = quiz_jobs.get(st.session_state.get('quiz_job_id'))
+        generating = job is not None and job.status in ('queued', 'running')
+        
+        if st.button("🎯 Generate Quiz", use_container_width=True, disabled=generating):
             if quiz_text and len(quiz_text.strip()) > 50:
-                with st.spinner("Creating your quiz..."):
-                    try:
-                        quiz = st.session_state.quiz_generator.generate_quiz(
-                            content=quiz_text,
-                            question_type=question_type,
-                            difficulty=difficulty,
-                            num_questions=num_questions,
-                            personalized=personalized
-                        )
-                        
-                        if quiz['questions']:
-                            st.session_state.generated_quiz = quiz
-                            st.session_state.current_question = 0
-                            st.session_state.user_answers = {}
-                            st.session_state.quiz_submitted = False
-                            st.session_state.quiz_results = None
-                            st.success(f"✅ Quiz created successfully with {len(quiz['questions'])} questions!")
-                            st.info("📝 Your quiz is ready! Switch to 'Take Quiz' tab to start answering questions.")
-                        else:
-                            st.error("❌ Could not generate questions from this content. Please try with more detailed material.")
-                    except Exception as e:
-                        st.error(f"❌ Error generating quiz: {str(e)}")
+                st.session_state.quiz_job_id = quiz_jobs.submit(
+                    'generate_quiz_from_bank',
+                    get_question_bank(),
+                    content=quiz_text,
+                    question_type=question_type,
+                    difficulty=difficulty,
+                    num_questions=num_questions,
+                    personalized=personalized,
+                    weakness=get_session_weakness()
+                )
+                st.rerun()
             elif quiz_text:
                 st.warning("⚠️ Please enter more study material (at least 50 characters)!")
             else:
                 st.warning("⚠️ Please enter study material first!")
         
+        if generating:
+            st.progress(job.progress, text="Creating your quiz..." if job.status == 'running' else "Waiting for a free worker...")
+            if st.button("✖ Cancel", use_container_width=True):
+                quiz_jobs.cancel(job.id)
+            time.sleep(0.5)
+            st.rerun()
+        elif job is not None:
+            del st.session_state.quiz_job_id
+            if job.status == 'done' and job.result['questions']:
+                quiz = job.result
+                st.session_state.generated_quiz = quiz
+                st.session_state.current_question = 0
+                st.session_state.user_answers = {}
+                st.session_state.quiz_submitted = False
+                st.session_state.quiz_results = None
+                st.success(f"✅ Quiz created successfully with {len(quiz['questions'])} questions!")
+                st.info("📝 Your quiz is ready! Switch to 'Take Quiz' tab to start answering questions.")
+            elif job.status == 'done':
+                st.error("❌ Could not generate questions from this content. Please try with more detailed material.")
+            elif job.status == 'failed':
+                st.error(f"❌ Error generating quiz: {str(job.error)}")
+            else:
+                st.info("Quiz generation cancelled.")
+        
         # Show struggled topics if any
-        if st.session_state.quiz_generator.struggled_topics:
+        struggled_topics = st.session_state.quiz_generator.struggled_topics
+        if struggled_topics:
             with st.expander("📚 Topics to Review"):
-                unique_topics = list(set(st.session_state.quiz_generator.struggled_topics[-10:]))
-                for topic in unique_topics:
+                for topic in struggled_topics[:10]:
                     st.markdown(f"• {topic}")
     
     with tab2:
@@ -1301,8 +1432,7 @@ The study of living organisms..."""
             st.markdown("#### Deck Management")
             
             if st.button("🔄 Reload from File", use_container_width=True):
-                f = get_flashcard_deck()
-                s = get_spaced_repetition()
+                f.load_deck()
                 st.success("✅ Deck reloaded!")
             
             if st.button("💾 Save to File", use_container_width=True):
@@ -1311,17 +1441,14 @@ The study of living organisms..."""
             
             if st.button("🗑️ Clear All Cards", use_container_width=True, type="secondary"):
                 if st.checkbox("I'm sure I want to delete all cards"):
-                    f.deck["cards"] = []
-                    f.save_deck()
-                    s.deck["cards"] = []
-                    s.save_deck()
+                    f.repository.clear()
                     st.success("✅ All cards cleared!")
         
         with col2:
             st.markdown("#### Export/Import")
             
             if st.button("📥 Export as JSON", use_container_width=True):
-                deck_data = f.deck
+                deck_data = {"cards": list(f.get_all_cards())}
                 st.download_button(
                     label="💾 Download JSON",
                     data=json.dumps(deck_data, indent=2),
@@ -1334,19 +1461,9 @@ The study of living organisms..."""
                 try:
                     imported_deck = json.load(uploaded_file)
                     if st.button("📤 Import Cards", use_container_width=True):
-                        existing_cards = f.get_all_cards()
-                        existing_fronts = {card["front"] for card in existing_cards}
-                        
-                        added = 0
-                        for card in imported_deck.get("cards", []):
-                            if card["front"] not in existing_fronts:
-                                f.deck["cards"].append(card)
-                                added += 1
+                        added = f.import_cards(imported_deck.get("cards", []))
                         
                         if added > 0:
-                            f.save_deck()
-                            s.deck["cards"] = f.deck["cards"]
-                            s.save_deck()
                             st.success(f"✅ Imported {added} new cards!")
                 except Exception as e:
                     st.error(f"Error importing file: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+DEFAULT_WEAKNESS_PATH = "./.quiz_cache/weakness.sqlite"
+DEFAULT_USER = os.environ.get("STUDYHUB_USER", "default")
+HALF_LIFE_DAYS = 14.0
+MISS_WEIGHT = 1.0
+HIT_WEIGHT = 0.5
+MIN_SCORE = 0.05
+
+
+class WeaknessModel:
+    def __init__(self, path=DEFAULT_WEAKNESS_PATH, user=DEFAULT_USER, half_life_days=HALF_LIFE_DAYS):
+        self.path = path
+        self.user = user
+        self.half_life = half_life_days * 86400
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS topic_scores (
+                user TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                score REAL NOT NULL,
+                updated REAL NOT NULL,
+                misses INTEGER NOT NULL DEFAULT 0,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user, topic)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+        self._topics = {
+            topic: [score, updated, misses, hits]
+            for topic, score, updated, misses, hits in self._conn.execute(
+                "SELECT topic, score, updated, misses, hits FROM topic_scores WHERE user = ?", (user,)
+            )
+        }
+
+    def _decayed(self, score, updated, now):
+        return score * 0.5 ** (max(0.0, now - updated) / self.half_life)
+
+    def record(self, topic, correct, now=None):
+        self.record_many([(topic, correct)], now)
+
+    def record_many(self, outcomes, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            changed = {}
+            for topic, correct in outcomes:
+                topic = topic.lower()
+                score, updated, misses, hits = self._topics.get(topic, (0.0, now, 0, 0))
+                score = self._decayed(score, updated, now)
+                if correct:
+                    score, hits = max(0.0, score - HIT_WEIGHT), hits + 1
+                else:
+                    score, misses = score + MISS_WEIGHT, misses + 1
+                self._topics[topic] = changed[topic] = [score, now, misses, hits]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO topic_scores (user, topic, score, updated, misses, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.user, topic, *values) for topic, values in changed.items()]
+            )
+            self._conn.commit()
+
+    def scores(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            result = {}
+            for topic, (score, updated, _, _) in self._topics.items():
+                score = self._decayed(score, updated, now)
+                if score >= MIN_SCORE:
+                    result[topic] = score
+            return result
+
+    def top_topics(self, limit=10, now=None):
+        scores = self.scores(now)
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM topic_scores WHERE user = ?", (self.user,))
+            self._conn.commit()
+            self._topics.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_models = weakref.WeakValueDictionary()
+_models_lock = threading.Lock()
+
+
+def get_weakness_model(user=DEFAULT_USER):
+    with _models_lock:
+        model = _models.get(user)
+        if model is None:
+            model = _models[user] = WeaknessModel(user=user)
+        return model
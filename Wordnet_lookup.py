@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from functools import lru_cache
+
+DEFAULT_STORE_PATH = "./.nlp_cache/wordnet.sqlite"
+
+
+class WordNetLookup:
+    def __init__(self, store_path=DEFAULT_STORE_PATH, maxsize=8192):
+        self.store_path = store_path
+        self._reader = None
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._store = None
+        if store_path and os.path.exists(store_path):
+            self._store = sqlite3.connect(store_path, check_same_thread=False)
+        self.antonyms = lru_cache(maxsize=maxsize)(self._antonyms)
+        self.siblings = lru_cache(maxsize=maxsize)(self._siblings)
+
+    @property
+    def wordnet(self):
+        with self._lock:
+            if self._reader is None:
+                from Nltk_resources import get_nltk_resources
+                self._reader = get_nltk_resources().load('wordnet')
+            return self._reader
+
+    def warm(self):
+        try:
+            self.wordnet
+        except LookupError:
+            pass
+
+    def warm_async(self):
+        worker = threading.Thread(target=self.warm, daemon=True)
+        worker.start()
+        return worker
+
+    def _stored(self, kind, word):
+        if self._store is None:
+            return None
+        with self._store_lock:
+            row = self._store.execute(
+                "SELECT value FROM lookups WHERE kind = ? AND word = ?", (kind, word)
+            ).fetchone()
+        return None if row is None else tuple(json.loads(row[0]))
+
+    def _antonyms(self, word):
+        stored = self._stored('antonyms', word)
+        if stored is not None:
+            return stored
+        try:
+            synsets = self.wordnet.synsets(word)
+        except LookupError:
+            return ()
+        antonyms = []
+        for syn in synsets:
+            for lemma in syn.lemmas():
+                if lemma.antonyms():
+                    antonyms.append(lemma.antonyms()[0].name())
+        return tuple(antonyms)
+
+    def _siblings(self, word):
+        stored = self._stored('siblings', word)
+        if stored is not None:
+            return stored
+        try:
+            wordnet = self.wordnet
+            synsets = wordnet.synsets(word.replace(' ', '_'), pos=wordnet.NOUN)
+        except LookupError:
+            return ()
+        siblings = []
+        seen = {word.lower()}
+        for syn in synsets[:2]:
+            for hypernym in syn.hypernyms()[:2]:
+                for hyponym in hypernym.hyponyms():
+                    if hyponym == syn:
+                        continue
+                    name = hyponym.lemmas()[0].name().replace('_', ' ')
+                    if name.lower() not in seen:
+                        seen.add(name.lower())
+                        siblings.append(name)
+        return tuple(siblings)
+
+    def cache_info(self):
+        return {"antonyms": self.antonyms.cache_info(), "siblings": self.siblings.cache_info()}
+
+
+def build_store(words, store_path=DEFAULT_STORE_PATH):
+    lookup = WordNetLookup(store_path=None)
+    directory = os.path.dirname(store_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(store_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lookups (
+            kind TEXT NOT NULL,
+            word TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (kind, word)
+        ) WITHOUT ROWID
+    """)
+    count = 0
+    for word in words:
+        word = word.strip()
+        if not word:
+            continue
+        rows = [('antonyms', word, json.dumps(lookup.antonyms(word))),
+                ('siblings', word, json.dumps(lookup.siblings(word)))]
+        conn.executemany("INSERT OR REPLACE INTO lookups (kind, word, value) VALUES (?, ?, ?)", rows)
+        count += 1
+    conn.commit()
+    conn.close()
+    return count
+
+
+_lookup = None
+_lookup_lock = threading.Lock()
+
+
+def get_wordnet_lookup():
+    global _lookup
+    with _lookup_lock:
+        if _lookup is None:
+            _lookup = WordNetLookup()
+        return _lookup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute WordNet lookups into an on-disk store")
+    parser.add_argument("vocabulary", help="Text file with one word or phrase per line")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    args = parser.parse_args(argv)
+    with open(args.vocabulary, 'r', encoding='utf-8') as f:
+        count = build_store(f, args.store)
+    print(f"Stored WordNet lookups for {count} words in {args.store}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()